@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""Packed, compressed archive storage for Generated_Data.
+
+Completed videos are packed into append-only shard files under
+Generated_Data/_archive/, each file compressed individually with zstd
+(zlib when zstandard is not installed) using a dictionary trained on
+transcripts. The catalog database indexes every packed file by its path, so
+read_text() can serve a file from a shard as if it were still on disk.
+
+Only one packer should run at a time; readers are safe alongside it.
+
+Usage:
+  python archive.py pack [--all] [--retrain] [video_id ...]   Pack videos and remove loose files
+  python archive.py unpack <video_id> ...                     Restore loose files
+  python archive.py bench [n_files]                           Compare archive vs loose files
+"""
+
+import hashlib
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+import catalog
+
+
+ARCHIVE_DIRNAME = "_archive"
+SHARD_MAX_BYTES = 256 * 1024 * 1024
+DICT_SIZE = 112 * 1024
+ZLIB_DICT_SIZE = 32 * 1024  # zlib only uses the last 32 KiB of a preset dictionary
+ZSTD_LEVEL = 19
+DICT_SAMPLE_FILES = 2000
+
+# Dictionaries loaded from the catalog and zstd decompressors, by dict_id
+_dict_cache: dict[int, object] = {}
+_decompressors: dict[int | None, object] = {}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def default_codec() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+def _entry(conn: sqlite3.Connection, path: Path) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT * FROM archive_entries WHERE relpath = ?", (catalog.relative_path(conn, path),)
+    ).fetchone()
+
+
+def exists(conn: sqlite3.Connection, path: Path) -> bool:
+    """True if path exists on disk or in the archive."""
+    return Path(path).is_file() or _entry(conn, path) is not None
+
+
+def is_archived(conn: sqlite3.Connection, directory: Path) -> bool:
+    prefix = catalog.relative_path(conn, directory).rstrip("/") + "/"
+    return conn.execute(
+        "SELECT 1 FROM archive_entries WHERE relpath >= ? AND relpath < ? LIMIT 1",
+        (prefix, prefix[:-1] + "0"),  # "0" sorts right after "/"
+    ).fetchone() is not None
+
+
+def _load_dict(conn: sqlite3.Connection, dict_id: int | None):
+    if dict_id is None:
+        return None
+    if dict_id not in _dict_cache:
+        row = conn.execute(
+            "SELECT codec, data FROM archive_dictionaries WHERE dict_id = ?", (dict_id,)
+        ).fetchone()
+        if row["codec"] == "zstd":
+            _require_zstandard()
+            _dict_cache[dict_id] = zstandard.ZstdCompressionDict(row["data"])
+        else:
+            _dict_cache[dict_id] = row["data"]
+    return _dict_cache[dict_id]
+
+
+def _compress(data: bytes, codec: str, dictionary) -> bytes:
+    if codec == "zstd":
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dictionary)
+        return cctx.compress(data)
+    if dictionary is not None:
+        c = zlib.compressobj(9, zdict=dictionary)
+    else:
+        c = zlib.compressobj(9)
+    return c.compress(data) + c.flush()
+
+
+def _require_zstandard() -> None:
+    if zstandard is None:
+        raise RuntimeError(
+            "This archive entry is zstd-compressed; install zstandard to read it "
+            "(uv sync --extra archive)."
+        )
+
+
+def _decompress(data: bytes, codec: str, dictionary, dict_id: int | None) -> bytes:
+    if codec == "zstd":
+        _require_zstandard()
+        if dict_id not in _decompressors:
+            _decompressors[dict_id] = zstandard.ZstdDecompressor(dict_data=dictionary)
+        return _decompressors[dict_id].decompress(data)
+    if dictionary is not None:
+        d = zlib.decompressobj(zdict=dictionary)
+    else:
+        d = zlib.decompressobj()
+    return d.decompress(data) + d.flush()
+
+
+def read_bytes(conn: sqlite3.Connection, path: Path) -> bytes:
+    """Read a file from disk, or from its shard if it has been archived."""
+    path = Path(path)
+    if path.is_file():
+        return path.read_bytes()
+    entry = _entry(conn, path)
+    if entry is None:
+        raise FileNotFoundError(path)
+    shard = catalog.catalog_base(conn) / ARCHIVE_DIRNAME / entry["shard"]
+    with open(shard, "rb") as f:
+        f.seek(entry["offset"])
+        data = f.read(entry["length"])
+    dict_id = entry["dict_id"]
+    return _decompress(data, entry["codec"], _load_dict(conn, dict_id), dict_id)
+
+
+def read_text(conn: sqlite3.Connection, path: Path) -> str:
+    return read_bytes(conn, path).decode("utf-8")
+
+
+def train_dictionary(conn: sqlite3.Connection, samples: list[bytes]) -> int | None:
+    """Train and store a dictionary from sample files. Returns its dict_id."""
+    codec = default_codec()
+    if codec == "zstd":
+        try:
+            data = zstandard.train_dictionary(DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            print(f"Warning: dictionary training failed ({e}); packing without a dictionary")
+            return None
+    else:
+        # zlib has no trainer; the tail of concatenated samples works as a preset dictionary
+        data = b"\n".join(samples)[-ZLIB_DICT_SIZE:]
+        if not data:
+            return None
+    cur = conn.execute(
+        "INSERT INTO archive_dictionaries (codec, data, created_at) VALUES (?, ?, ?)",
+        (codec, data, _now()),
+    )
+    return cur.lastrowid
+
+
+def _current_dictionary(conn: sqlite3.Connection) -> int | None:
+    row = conn.execute(
+        "SELECT MAX(dict_id) FROM archive_dictionaries WHERE codec = ?", (default_codec(),)
+    ).fetchone()
+    return row[0]
+
+
+def _open_shard(archive_dir: Path, incoming: int):
+    """Latest shard with room for `incoming` more bytes, opened for appending."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    shards = sorted(archive_dir.glob("shard-*.pack"))
+    if shards and shards[-1].stat().st_size + incoming <= SHARD_MAX_BYTES:
+        shard = shards[-1]
+    else:
+        shard = archive_dir / f"shard-{len(shards):05d}.pack"
+    return shard, open(shard, "ab")
+
+
+def pack_video(conn: sqlite3.Connection, video_id: str, dict_id: int | None) -> tuple[int, int]:
+    """Append every file in a video's directory to a shard, then remove the directory.
+
+    The shard is fsynced before the index commits, and the loose files are only
+    removed after the commit, so a crash never leaves a file unreachable.
+    Returns: (raw_bytes, packed_bytes).
+    """
+    video = catalog.get_video(conn, video_id)
+    video_dir = catalog.resolve_path(conn, video["directory"])
+    files = sorted(p for p in video_dir.rglob("*") if p.is_file())
+    if not files:
+        return 0, 0
+
+    codec = default_codec()
+    dictionary = _load_dict(conn, dict_id)
+    blobs = []
+    for f in files:
+        raw = f.read_bytes()
+        blobs.append((f, raw, _compress(raw, codec, dictionary)))
+
+    archive_dir = catalog.catalog_base(conn) / ARCHIVE_DIRNAME
+    shard, out = _open_shard(archive_dir, sum(len(b[2]) for b in blobs))
+    rows = []
+    with out:
+        offset = out.seek(0, os.SEEK_END)
+        for f, raw, packed in blobs:
+            out.write(packed)
+            rows.append((
+                catalog.relative_path(conn, f), video_id, shard.name, offset, len(packed), len(raw),
+                hashlib.sha256(raw).hexdigest(), codec, dict_id, _now(),
+            ))
+            offset += len(packed)
+        out.flush()
+        os.fsync(out.fileno())
+
+    with conn:
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO archive_entries
+                (relpath, video_id, shard, offset, length, raw_size, sha256, codec, dict_id, packed_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            rows,
+        )
+    shutil.rmtree(video_dir)
+    return sum(r[5] for r in rows), sum(r[4] for r in rows)
+
+
+def unpack_video(conn: sqlite3.Connection, video_id: str) -> int:
+    """Restore a video's archived files to disk. Returns the number of files restored.
+
+    Shard bytes are left in place (shards are append-only).
+    """
+    entries = conn.execute(
+        "SELECT relpath FROM archive_entries WHERE video_id = ?", (video_id,)
+    ).fetchall()
+    base = catalog.catalog_base(conn)
+    for entry in entries:
+        path = base / entry["relpath"]
+        data = read_bytes(conn, path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+    with conn:
+        conn.execute("DELETE FROM archive_entries WHERE video_id = ?", (video_id,))
+    return len(entries)
+
+
+def completed_videos(conn: sqlite3.Connection) -> list[str]:
+    """Cataloged videos with a clean text and at least one style output."""
+    rows = conn.execute(
+        """
+        SELECT v.video_id FROM videos v
+        WHERE EXISTS (SELECT 1 FROM artifacts a WHERE a.video_id = v.video_id AND a.kind = 'clean_text')
+          AND EXISTS (SELECT 1 FROM artifacts a WHERE a.video_id = v.video_id AND a.kind LIKE 'style:%')
+        ORDER BY v.video_id
+        """
+    ).fetchall()
+    return [r["video_id"] for r in rows]
+
+
+def _dictionary_samples(conn: sqlite3.Connection, video_ids: list[str]) -> list[bytes]:
+    samples = []
+    for video_id in video_ids:
+        for artifact in catalog.get_artifacts(conn, video_id):
+            path = catalog.resolve_path(conn, artifact["path"])
+            if path.is_file():
+                samples.append(path.read_bytes())
+        if len(samples) >= DICT_SAMPLE_FILES:
+            break
+    return samples
+
+
+def pack(base_dir: Path, video_ids: list[str], retrain: bool = False) -> None:
+    conn = catalog.open_catalog(base_dir)
+    candidates = [v for v in video_ids if catalog.get_video(conn, v) is not None]
+    todo = [
+        v for v in candidates
+        if catalog.resolve_path(conn, catalog.get_video(conn, v)["directory"]).is_dir()
+    ]
+    if not todo:
+        print("Nothing to pack.")
+        return
+
+    dict_id = None if retrain else _current_dictionary(conn)
+    if dict_id is None:
+        with conn:
+            dict_id = train_dictionary(conn, _dictionary_samples(conn, todo))
+
+    raw_total = packed_total = 0
+    start = time.time()
+    for video_id in todo:
+        raw, packed = pack_video(conn, video_id, dict_id)
+        raw_total += raw
+        packed_total += packed
+        print(f"  {video_id}: {raw} -> {packed} bytes")
+    elapsed = time.time() - start
+    ratio = raw_total / packed_total if packed_total else 0.0
+    print(
+        f"Packed {len(todo)} videos with {default_codec()}: {raw_total} -> {packed_total} bytes "
+        f"(ratio {ratio:.2f}x) in {elapsed:.1f}s"
+    )
+    conn.close()
+
+
+def bench(base_dir: Path, n_files: int = 500) -> None:
+    """Compare compression ratio and random-read latency of the archive vs loose files.
+
+    Files are sampled without replacement; the dictionary is trained on a
+    separate quarter of them so the ratio is not measured on training data.
+    """
+    sources = [p for p in base_dir.rglob("*") if p.is_file() and p.suffix in (".txt", ".md")
+               and ARCHIVE_DIRNAME not in p.parts]
+    if len(sources) < 2:
+        print(f"Need at least 2 loose .txt/.md files under {base_dir} to benchmark.", file=sys.stderr)
+        return
+    rng = random.Random(0)
+    rng.shuffle(sources)
+    n_train = min(DICT_SAMPLE_FILES, max(1, len(sources) // 4))
+    training = sources[:n_train]
+    sample = sources[n_train:n_train + n_files]
+
+    # dict_ids restart at 1 in the scratch catalog
+    _dict_cache.clear()
+    _decompressors.clear()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmp = Path(tmpdir)
+        conn = catalog.open_catalog(tmp)
+        loose = []
+        for i, src in enumerate(sample):
+            video_dir = tmp / f"video{i:05d}"
+            video_dir.mkdir()
+            dst = video_dir / src.name
+            shutil.copyfile(src, dst)
+            loose.append(dst)
+            with conn:
+                catalog.record_video(conn, f"vid{i:05d}", video_dir.name, video_dir)
+
+        # Loose-file reads first, while the files still exist
+        loose_times = _time_reads(lambda p: p.read_bytes(), loose, rng)
+        raw_total = sum(p.stat().st_size for p in loose)
+        with conn:
+            dict_id = train_dictionary(conn, [p.read_bytes() for p in training])
+        copies = {p: p.read_bytes() for p in loose}
+        packed_total = 0
+        for i in range(len(loose)):
+            packed_total += pack_video(conn, f"vid{i:05d}", dict_id)[1]
+        _dict_cache.clear()
+        _decompressors.clear()
+        archive_times = _time_reads(lambda p: read_bytes(conn, p), loose, rng)
+        assert all(read_bytes(conn, p) == data for p, data in copies.items())
+        conn.close()
+    _dict_cache.clear()
+    _decompressors.clear()
+
+    print(
+        f"Files: {len(loose)} measured ({raw_total / 1e6:.2f} MB), "
+        f"{len(training)} held out for dictionary training, codec {default_codec()}"
+    )
+    print(f"Compression ratio: {raw_total / packed_total:.2f}x ({packed_total / 1e6:.2f} MB packed)")
+    for label, times in (("loose", loose_times), ("archive", archive_times)):
+        times.sort()
+        print(
+            f"Read latency {label:<8} p50 {times[len(times) // 2] * 1e3:.3f} ms, "
+            f"p99 {times[int(len(times) * 0.99)] * 1e3:.3f} ms"
+        )
+
+
+def _time_reads(read, paths: list[Path], rng: random.Random) -> list[float]:
+    order = list(paths)
+    rng.shuffle(order)
+    times = []
+    for p in order:
+        start = time.perf_counter()
+        read(p)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    base_dir = script_dir / "Generated_Data"
+    if len(sys.argv) < 2 or sys.argv[1] not in ("pack", "unpack", "bench"):
+        print(__doc__.split("Usage:")[1].rstrip(), file=sys.stderr)
+        return 1
+
+    command = sys.argv[1]
+    flags = [a for a in sys.argv[2:] if a.startswith("--")]
+    args = [a for a in sys.argv[2:] if not a.startswith("--")]
+
+    if command == "bench":
+        bench(base_dir, int(args[0]) if args else 500)
+        return 0
+
+    conn = catalog.open_catalog(base_dir)
+    if command == "pack":
+        video_ids = args or (completed_videos(conn) if "--all" in flags else [])
+        if not video_ids:
+            print("Usage: python archive.py pack [--all] [--retrain] [video_id ...]", file=sys.stderr)
+            return 1
+        conn.close()
+        pack(base_dir, video_ids, retrain="--retrain" in flags)
+        return 0
+
+    if not args:
+        print("Usage: python archive.py unpack <video_id> ...", file=sys.stderr)
+        return 1
+    for video_id in args:
+        print(f"  {video_id}: restored {unpack_video(conn, video_id)} files")
+    conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
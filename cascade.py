@@ -0,0 +1,155 @@
+"""Cheap-first model cascade for transcript transforms.
+
+Each transcript goes to the first (cheapest/fastest) model in the cascade.
+The output is checked locally; only outputs that fail a check are escalated
+to the next, stronger model. Every attempt is logged with its latency, token
+usage and cost so routing can be tuned from the usage log.
+"""
+
+import os
+import re
+import time
+from pathlib import Path
+from typing import Callable
+
+from prompts import record_usage
+
+
+# Cheapest/fastest first. Override with MODEL_CASCADE=model1,model2,...
+DEFAULT_CASCADE = [
+    "openai/gpt-5-nano",
+    "google/gemini-3-flash-preview",
+    "google/gemini-3-pro-preview",
+]
+
+# Fraction of the style guide's numbered output sections that must appear as
+# headings in the output. Some sections are optional ("omit if not applicable").
+MIN_HEADING_COVERAGE = 0.5
+
+# Output words / transcript words. Only enforced above MIN_RATIO_WORDS input
+# words, since very short transcripts legitimately expand into a full template.
+MIN_LENGTH_RATIO = 0.05
+MAX_LENGTH_RATIO = 4.0
+MIN_RATIO_WORDS = 500
+
+_SECTION_RE = re.compile(r"^#{2,4}\s+\d+\.\s+(.+?)\s*$", re.MULTILINE)
+_HEADING_RE = re.compile(r"^#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+
+
+def get_cascade() -> list[str]:
+    value = os.environ.get("MODEL_CASCADE", "").strip()
+    if not value:
+        return DEFAULT_CASCADE.copy()
+    return [m.strip() for m in value.split(",") if m.strip()]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split())
+
+
+def expected_headings(style_content: str) -> list[str]:
+    """Numbered section titles ("### 1. Overview") listed in a style guide."""
+    headings = []
+    for title in _SECTION_RE.findall(style_content):
+        # "Materials List / BOM" -> match on "materials list"
+        title = title.split("/")[0]
+        headings.append(_normalize(title))
+    return headings
+
+
+def validate_output(body: str, style_content: str, transcript_content: str) -> list[str]:
+    """Run fast local checks on a transform. Returns failure reasons (empty = pass)."""
+    if not body.strip():
+        return ["empty output"]
+
+    failures = []
+
+    expected = expected_headings(style_content)
+    if expected:
+        found = " | ".join(_normalize(h) for h in _HEADING_RE.findall(body))
+        matched = sum(1 for h in expected if h in found)
+        if matched / len(expected) < MIN_HEADING_COVERAGE:
+            failures.append(f"headings: {matched}/{len(expected)} expected sections present")
+
+    input_words = len(transcript_content.split())
+    if input_words >= MIN_RATIO_WORDS:
+        ratio = len(body.split()) / input_words
+        if ratio < MIN_LENGTH_RATIO or ratio > MAX_LENGTH_RATIO:
+            failures.append(f"length ratio {ratio:.2f} outside {MIN_LENGTH_RATIO}-{MAX_LENGTH_RATIO}")
+
+    # We prepend our own front matter, so the body must not carry its own or be
+    # wrapped in a code fence (which would hide the front matter from parsers).
+    stripped = body.lstrip()
+    if stripped.startswith("---"):
+        failures.append("front matter: output starts with its own front matter block")
+    elif stripped.startswith("```"):
+        failures.append("front matter: output is wrapped in a code fence")
+
+    return failures
+
+
+def transform_with_cascade(
+    style_content: str,
+    transcript_content: str,
+    api_key: str,
+    transform: Callable[..., tuple[str, dict]],
+    models: list[str] | None = None,
+    log_file: Path | None = None,
+    log_context: dict | None = None,
+) -> tuple[str, dict]:
+    """Try each model in order until one produces an output that passes validation.
+
+    transform is called as transform(style_content, transcript_content, api_key,
+    model=model) and returns (content, usage). If every model fails validation,
+    the last model's output is returned rather than discarded; if every model
+    raises, the last error is re-raised.
+
+    Returns: (content, usage) of the accepted attempt, with "model" and
+    "attempts" added to usage.
+    """
+    models = models or get_cascade()
+    # Several styles can cascade concurrently; tag lines with the style
+    style = (log_context or {}).get("style")
+    tag = f"{style} " if style else ""
+    last_result = None
+    last_error = None
+
+    for attempt, model in enumerate(models, start=1):
+        is_last = attempt == len(models)
+        start = time.time()
+        try:
+            content, usage = transform(style_content, transcript_content, api_key, model=model)
+            failures = validate_output(content, style_content, transcript_content)
+        except Exception as e:
+            content, usage = "", {}
+            failures = [f"error: {e}"]
+            last_error = e
+        elapsed = time.time() - start
+
+        decision = "accepted" if not failures else ("exhausted" if is_last else "escalated")
+        cost = usage.get("cost")
+        cost_text = f", ${cost:.5f}" if cost is not None else ""
+        print(f"  [{tag}{attempt}/{len(models)}] {model}: {decision} ({elapsed:.1f}s{cost_text})")
+        for reason in failures:
+            print(f"      - {reason}")
+        if log_file is not None:
+            record_usage(log_file, {
+                **(log_context or {}),
+                "model": model,
+                "routing": decision,
+                "attempt": attempt,
+                "elapsed": round(elapsed, 3),
+                "failures": failures,
+                **usage,
+            })
+
+        if content:
+            last_result = (content, {**usage, "model": model, "attempts": attempt})
+        if not failures:
+            return last_result
+
+    if last_result is not None:
+        return last_result
+    if last_error is not None:
+        raise last_error
+    raise ValueError("Every model in the cascade returned empty content.")
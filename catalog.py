@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""Corpus catalog: SQLite index of everything under Generated_Data.
+
+Maps video_id -> title, directory and artifact files (with hashes, fetch
+backend, model and timestamps) so existence checks and lookups are indexed
+queries instead of yt-dlp title lookups or directory walks. Every stage
+records its outputs in a single transaction.
+
+Usage:
+  python catalog.py rebuild [generated_data_dir] [--map <dir>=<video_id> ...]
+      Rebuild the catalog from disk. --map writes the .video_id marker for
+      directories created before markers existed, so they are indexed too.
+  python catalog.py show <video_id>                Print what is recorded for a video
+"""
+
+import hashlib
+import sqlite3
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+CATALOG_FILENAME = "catalog.sqlite3"
+# Written by the download stage so the catalog can be rebuilt from disk
+VIDEO_ID_FILENAME = ".video_id"
+
+# Artifact kinds by filename suffix; style outputs are "style:<name>"
+ARTIFACT_SUFFIXES = {
+    "_formatted_transcript.txt": "formatted_transcript",
+    "_clean_text.txt": "clean_text",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    video_id   TEXT PRIMARY KEY,
+    title      TEXT NOT NULL,
+    directory  TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS videos_directory ON videos (directory);
+
+CREATE TABLE IF NOT EXISTS artifacts (
+    video_id   TEXT NOT NULL REFERENCES videos (video_id) ON DELETE CASCADE,
+    kind       TEXT NOT NULL,
+    path       TEXT NOT NULL,
+    sha256     TEXT NOT NULL,
+    backend    TEXT,
+    model      TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (video_id, kind)
+);
+CREATE INDEX IF NOT EXISTS artifacts_path ON artifacts (path);
+
+-- Near-duplicate index maintained by near_duplicates.py
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    video_id  TEXT PRIMARY KEY,
+    signature BLOB NOT NULL,
+    shingles  INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band     INTEGER NOT NULL,
+    bucket   INTEGER NOT NULL,
+    video_id TEXT NOT NULL,
+    PRIMARY KEY (band, bucket, video_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lsh_buckets_video ON lsh_buckets (video_id);
+
+-- Packed files maintained by archive.py; relpath is relative to the catalog dir
+CREATE TABLE IF NOT EXISTS archive_entries (
+    relpath   TEXT PRIMARY KEY,
+    video_id  TEXT NOT NULL,
+    shard     TEXT NOT NULL,
+    offset    INTEGER NOT NULL,
+    length    INTEGER NOT NULL,
+    raw_size  INTEGER NOT NULL,
+    sha256    TEXT NOT NULL,
+    codec     TEXT NOT NULL,
+    dict_id   INTEGER,
+    packed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archive_entries_video ON archive_entries (video_id);
+
+CREATE TABLE IF NOT EXISTS archive_dictionaries (
+    dict_id    INTEGER PRIMARY KEY,
+    codec      TEXT NOT NULL,
+    data       BLOB NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def open_catalog(base_dir: Path) -> sqlite3.Connection:
+    """Open (creating if needed) the catalog for a Generated_Data directory."""
+    base_dir = Path(base_dir)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(base_dir / CATALOG_FILENAME, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def catalog_base(conn: sqlite3.Connection) -> Path:
+    """Directory the catalog lives in; stored paths are relative to it."""
+    return Path(conn.execute("PRAGMA database_list").fetchone()["file"]).parent
+
+
+def relative_path(conn: sqlite3.Connection, path: Path) -> str:
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(catalog_base(conn).resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def resolve_path(conn: sqlite3.Connection, stored: str) -> Path:
+    return catalog_base(conn) / stored
+
+
+def record_video(
+    conn: sqlite3.Connection,
+    video_id: str,
+    title: str,
+    directory: Path,
+    created_at: str | None = None,
+) -> None:
+    """Insert or update a video. created_at only applies to new rows (rebuild carries it over)."""
+    now = _now()
+    conn.execute(
+        """
+        INSERT INTO videos (video_id, title, directory, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (video_id) DO UPDATE SET
+            title = excluded.title,
+            directory = excluded.directory,
+            updated_at = excluded.updated_at
+        """,
+        (video_id, title, relative_path(conn, directory), created_at or now, now),
+    )
+
+
+def record_artifact(
+    conn: sqlite3.Connection,
+    video_id: str,
+    kind: str,
+    path: Path,
+    backend: str | None = None,
+    model: str | None = None,
+    sha256: str | None = None,
+    created_at: str | None = None,
+) -> None:
+    """Insert or update an artifact. created_at only applies to new rows (rebuild carries it over)."""
+    now = _now()
+    conn.execute(
+        """
+        INSERT INTO artifacts (video_id, kind, path, sha256, backend, model, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (video_id, kind) DO UPDATE SET
+            path = excluded.path,
+            sha256 = excluded.sha256,
+            backend = COALESCE(excluded.backend, artifacts.backend),
+            model = COALESCE(excluded.model, artifacts.model),
+            updated_at = excluded.updated_at
+        """,
+        (
+            video_id, kind, relative_path(conn, path), sha256 or file_sha256(path),
+            backend, model, created_at or now, now,
+        ),
+    )
+
+
+def get_video(conn: sqlite3.Connection, video_id: str) -> sqlite3.Row | None:
+    return conn.execute("SELECT * FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+
+
+def get_video_by_directory(conn: sqlite3.Connection, directory: Path) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT * FROM videos WHERE directory = ?", (relative_path(conn, directory),)
+    ).fetchone()
+
+
+def get_artifact(conn: sqlite3.Connection, video_id: str, kind: str) -> sqlite3.Row | None:
+    return conn.execute(
+        "SELECT * FROM artifacts WHERE video_id = ? AND kind = ?", (video_id, kind)
+    ).fetchone()
+
+
+def get_artifacts(conn: sqlite3.Connection, video_id: str) -> list[sqlite3.Row]:
+    return conn.execute(
+        "SELECT * FROM artifacts WHERE video_id = ? ORDER BY kind", (video_id,)
+    ).fetchall()
+
+
+def find_artifact_path(conn: sqlite3.Connection, directory: Path, kind: str) -> Path | None:
+    """Indexed lookup of an artifact file for a video directory."""
+    row = conn.execute(
+        """
+        SELECT a.path FROM artifacts a JOIN videos v USING (video_id)
+        WHERE v.directory = ? AND a.kind = ?
+        """,
+        (relative_path(conn, directory), kind),
+    ).fetchone()
+    return resolve_path(conn, row["path"]) if row else None
+
+
+def artifact_kind(filename: str) -> str | None:
+    """Artifact kind for a file in a video directory, or None if not an artifact."""
+    for suffix, kind in ARTIFACT_SUFFIXES.items():
+        if filename.endswith(suffix):
+            return kind
+    return None
+
+
+def write_marker(video_dir: Path, video_id: str) -> None:
+    """Write the .video_id marker that maps video_dir back to its video ID."""
+    (Path(video_dir) / VIDEO_ID_FILENAME).write_text(video_id + "\n", encoding="utf-8")
+
+
+def rebuild(base_dir: Path, id_map: dict[str, str] | None = None) -> int:
+    """Rebuild the catalog from the directories under base_dir.
+
+    Videos are identified by their .video_id marker; directories without one
+    are skipped. id_map ({directory_name: video_id}) backfills markers for
+    directories that predate them before indexing. Artifacts are re-hashed;
+    backend/model recorded previously are kept when the file is unchanged,
+    and created_at is always carried over. Videos packed by archive.py have
+    no directory on disk and are kept as they are. Returns the number of
+    videos indexed.
+    """
+    base_dir = Path(base_dir)
+    for name, video_id in (id_map or {}).items():
+        video_dir = base_dir / name
+        if not video_dir.is_dir():
+            raise FileNotFoundError(f"Directory not found: {video_dir}")
+        write_marker(video_dir, video_id)
+    conn = open_catalog(base_dir)
+    previous = {
+        (row["video_id"], row["kind"]): row
+        for row in conn.execute("SELECT * FROM artifacts")
+    }
+    video_created = {
+        row["video_id"]: row["created_at"]
+        for row in conn.execute("SELECT video_id, created_at FROM videos")
+    }
+    # Packed videos stay cataloged; a directory re-created for one (e.g. by a
+    # new transform) may lack the marker but is still that video
+    archived_dirs = {
+        row["directory"]: row["video_id"]
+        for row in conn.execute(
+            "SELECT video_id, directory FROM videos "
+            "WHERE video_id IN (SELECT video_id FROM archive_entries)"
+        )
+    }
+    count = 0
+    with conn:
+        archived = "SELECT video_id FROM archive_entries"
+        conn.execute(f"DELETE FROM artifacts WHERE video_id NOT IN ({archived})")
+        conn.execute(f"DELETE FROM videos WHERE video_id NOT IN ({archived})")
+        # _archive/ holds archive.py shards, not a video
+        for video_dir in sorted(p for p in base_dir.iterdir() if p.is_dir() and p.name != "_archive"):
+            marker = video_dir / VIDEO_ID_FILENAME
+            if not marker.is_file():
+                archived_id = archived_dirs.get(relative_path(conn, video_dir))
+                if archived_id is None:
+                    print(
+                        f"Skipping {video_dir.name}: no {VIDEO_ID_FILENAME} marker "
+                        f"(backfill with --map '{video_dir.name}=<video_id>')"
+                    )
+                    continue
+                write_marker(video_dir, archived_id)
+            video_id = marker.read_text(encoding="utf-8").strip()
+            record_video(conn, video_id, video_dir.name, video_dir, video_created.get(video_id))
+            for f in sorted(video_dir.iterdir()):
+                if not f.is_file():
+                    continue
+                kind = artifact_kind(f.name)
+                if kind is None and f.suffix == ".md" and f.stem.startswith(video_dir.name + "_"):
+                    kind = "style:" + f.stem[len(video_dir.name) + 1:]
+                if kind is None:
+                    continue
+                sha = file_sha256(f)
+                old = previous.get((video_id, kind))
+                created_at = old["created_at"] if old is not None else None
+                if old is not None and old["sha256"] == sha:
+                    record_artifact(
+                        conn, video_id, kind, f, old["backend"], old["model"], sha, created_at
+                    )
+                else:
+                    record_artifact(conn, video_id, kind, f, sha256=sha, created_at=created_at)
+            count += 1
+    conn.close()
+    return count
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    if len(sys.argv) < 2 or sys.argv[1] not in ("rebuild", "show"):
+        print(__doc__.split("Usage:")[1].rstrip(), file=sys.stderr)
+        return 1
+
+    if sys.argv[1] == "rebuild":
+        args = sys.argv[2:]
+        id_map = {}
+        while "--map" in args:
+            i = args.index("--map")
+            if i + 1 >= len(args) or "=" not in args[i + 1]:
+                print("Usage: --map <dir>=<video_id>", file=sys.stderr)
+                return 1
+            name, video_id = args[i + 1].rsplit("=", 1)
+            # Accept a path or a bare directory name under the base directory
+            id_map[Path(name).name] = video_id.strip()
+            del args[i:i + 2]
+        base_dir = Path(args[0]) if args else script_dir / "Generated_Data"
+        if not base_dir.is_dir():
+            print(f"Error: Directory not found: {base_dir}", file=sys.stderr)
+            return 1
+        try:
+            count = rebuild(base_dir, id_map)
+        except FileNotFoundError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        print(f"Indexed {count} videos into {base_dir / CATALOG_FILENAME}")
+        return 0
+
+    if len(sys.argv) < 3:
+        print("Usage: python catalog.py show <video_id>", file=sys.stderr)
+        return 1
+    conn = open_catalog(script_dir / "Generated_Data")
+    video = get_video(conn, sys.argv[2])
+    if video is None:
+        print(f"Not in catalog: {sys.argv[2]}", file=sys.stderr)
+        return 1
+    print(f"{video['video_id']}: {video['title']} ({video['directory']})")
+    for a in get_artifacts(conn, video["video_id"]):
+        extra = ", ".join(f"{k}={a[k]}" for k in ("backend", "model") if a[k])
+        print(f"  {a['kind']:<24} {a['path']}  {a['sha256'][:12]}  {a['updated_at']}  {extra}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,25 @@ import re
 import subprocess
 import sys
 import tempfile
+from pathlib import Path
+from urllib.error import HTTPError
 from urllib.parse import urlparse, parse_qs
 from youtube_transcript_api import YouTubeTranscriptApi
 
+# Load .env before reading env vars (YOUTUBE_* settings for fetch_session)
+try:
+    from dotenv import load_dotenv
+    script_dir = Path(__file__).resolve().parent
+    load_dotenv(script_dir / ".env")
+except ImportError:
+    pass
+
+import archive
+import catalog
+import fetch_session
+import near_duplicates
+from style_guides import missing_styles, print_available_styles, resolve_styles
+
 
 def extract_video_id(url_or_id):
     """Extract video ID from YouTube URL or return as-is if already an ID."""
@@ -40,6 +56,7 @@ def get_safe_title(video_id):
         cmd = [
             "yt-dlp",
             "--get-title",
+            *fetch_session.subprocess_proxy_args(),
             f"https://www.youtube.com/watch?v={video_id}"
         ]
         result = subprocess.run(cmd, capture_output=True, text=True, check=True)
@@ -148,10 +165,15 @@ def _parse_vtt(vtt_content):
     return entries
 
 
+_transcript_api = None
+
+
 def _fetch_via_transcript_api(video_id):
-    """Primary method: youtube-transcript-api"""
-    api = YouTubeTranscriptApi()
-    transcript = api.fetch(video_id)
+    """Primary method: youtube-transcript-api (shared throttled session)"""
+    global _transcript_api
+    if _transcript_api is None:
+        _transcript_api = YouTubeTranscriptApi(http_client=fetch_session.get_session())
+    transcript = _transcript_api.fetch(video_id)
     return [(entry.start, entry.text) for entry in transcript]
 
 
@@ -160,23 +182,40 @@ def _fetch_via_pytube(video_id):
     from pytube import YouTube
 
     url = f"https://www.youtube.com/watch?v={video_id}"
-    yt = YouTube(url)
-
-    # Try to get English captions first, then any available
-    caption = None
-    if 'en' in yt.captions:
-        caption = yt.captions['en']
-    elif 'a.en' in yt.captions:  # Auto-generated English
-        caption = yt.captions['a.en']
-    elif yt.captions:
-        # Get the first available caption
-        caption = list(yt.captions.values())[0]
+    # pytube uses urllib, not the shared session: throttle each of its
+    # requests and route them through the next proxy in the pool
+    fetch_session.throttle_pytube()
+    session = fetch_session.get_session()
+    proxy = session.proxy_pool.choose()
+    yt = YouTube(url, proxies={"http": proxy, "https": proxy} if proxy else None)
+
+    try:
+        # Try to get English captions first, then any available
+        caption = None
+        if 'en' in yt.captions:
+            caption = yt.captions['en']
+        elif 'a.en' in yt.captions:  # Auto-generated English
+            caption = yt.captions['a.en']
+        elif yt.captions:
+            # Get the first available caption
+            caption = list(yt.captions.values())[0]
+
+        # Get SRT format
+        srt_content = caption.generate_srt_captions() if caption else None
+    except HTTPError as e:
+        # The proxy answered; a 429 slows the shared limiter as it does for the session
+        if e.code == 429:
+            session.limiter.penalize(fetch_session.retry_after_seconds(e.headers.get("Retry-After")))
+        session.proxy_pool.report(proxy, True)
+        raise
+    except OSError:
+        # Connection-level failure (URLError, timeout): bench the proxy
+        session.proxy_pool.report(proxy, False)
+        raise
+    session.proxy_pool.report(proxy, True)
 
     if not caption:
         raise Exception("No captions available via pytube")
-
-    # Get SRT format and parse it
-    srt_content = caption.generate_srt_captions()
     return _parse_srt(srt_content)
 
 
@@ -194,6 +233,7 @@ def _fetch_via_ytdlp(video_id):
             "--sub-lang", "en",
             "--sub-format", "vtt",
             "--skip-download",
+            *fetch_session.subprocess_proxy_args(),
             "-o", output_template,
             url
         ]
@@ -215,6 +255,12 @@ def _fetch_via_ytdlp(video_id):
 
 def fetch_transcript_with_fallbacks(video_id):
     """Try each method in sequence until one succeeds."""
+    entries, _ = _fetch_with_backend(video_id)
+    return entries
+
+
+def _fetch_with_backend(video_id):
+    """Like fetch_transcript_with_fallbacks, but also return the backend name used."""
     methods = [
         ("youtube-transcript-api", _fetch_via_transcript_api),
         ("pytube", _fetch_via_pytube),
@@ -226,7 +272,7 @@ def fetch_transcript_with_fallbacks(video_id):
         try:
             result = method(video_id)
             print(f"Success with {name}")
-            return result
+            return result, name
         except Exception as e:
             print(f"{name} failed: {e}")
             errors.append((name, str(e)))
@@ -235,7 +281,7 @@ def fetch_transcript_with_fallbacks(video_id):
     print("All transcript methods failed:")
     for name, error in errors:
         print(f"  - {name}: {error}")
-    return None
+    return None, None
 
 
 def _extract_unique_text(entries):
@@ -307,15 +353,16 @@ def _format_as_paragraphs(text):
     return '\n\n'.join(paragraphs)
 
 
-def download_transcript(video_id, output_dir, title=None):
+def download_transcript(video_id, output_dir, title=None, catalog_conn=None):
     """Download transcript using fallback chain and save to files.
 
     Args:
         video_id: YouTube video ID
         output_dir: Directory to save files
         title: Optional title for filenames (defaults to video_id)
+        catalog_conn: Optional catalog connection to record the outputs in
     """
-    entries = fetch_transcript_with_fallbacks(video_id)
+    entries, backend = _fetch_with_backend(video_id)
 
     if not entries:
         print(f"Error: Could not download transcript for {video_id}")
@@ -337,66 +384,96 @@ def download_transcript(video_id, output_dir, title=None):
         formatted_text = _format_as_paragraphs(unique_text)
         f.write(formatted_text)
 
+    # Marker lets `catalog.py rebuild` map the directory back to its video ID
+    catalog.write_marker(Path(output_dir), video_id)
+
+    if catalog_conn is not None:
+        with catalog_conn:
+            catalog.record_video(catalog_conn, video_id, file_prefix, Path(output_dir))
+            catalog.record_artifact(
+                catalog_conn, video_id, "formatted_transcript", Path(raw_path), backend=backend
+            )
+            catalog.record_artifact(
+                catalog_conn, video_id, "clean_text", Path(clean_path), backend=backend
+            )
+            near_duplicates.index_text(catalog_conn, video_id, formatted_text)
+
     return entries
 
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("Usage: python download_transcript.py <youtube-url-or-id> [style]")
-        print("  If style is provided, transcript is saved under Generated_Data and transformed with that style.")
+        print("Usage: python download_transcript.py <youtube-url-or-id> [style ...]")
+        print("  If styles are provided, transcript is saved under Generated_Data and transformed with each style.")
+        print("  Styles may be space- or comma-separated; 'all' uses every style in styles/.")
         print("Examples:")
         print("  python download_transcript.py KE39P4qBjDk")
         print("  python download_transcript.py 'https://www.youtube.com/watch?v=KE39P4qBjDk' coding_agent")
+        print("  python download_transcript.py KE39P4qBjDk coding_agent,knowledge_base")
         sys.exit(1)
 
     video_id = extract_video_id(sys.argv[1])
-    style = sys.argv[2] if len(sys.argv) >= 3 else None
-    print(f"Video ID: {video_id}")
-    if style:
-        print(f"Style: {style}")
-
     project_root = os.path.dirname(os.path.abspath(__file__))
+    styles_dir = Path(project_root) / "styles"
+
+    styles = resolve_styles(sys.argv[2:], styles_dir)
+    # Fail before downloading anything, as transform_transcript.py does
+    missing = missing_styles(styles, styles_dir)
+    if missing:
+        for style_file in missing:
+            print(f"Error: Style guide not found: {style_file}", file=sys.stderr)
+        print_available_styles(styles_dir)
+        sys.exit(1)
+    print(f"Video ID: {video_id}")
+    if styles:
+        print(f"Styles: {', '.join(styles)}")
     output_base = os.path.join(project_root, "Generated_Data")
 
-    # 1. Get Title and Create Directory (always under Generated_Data)
-    title = get_safe_title(video_id)
-    output_dir = os.path.join(output_base, title)
+    conn = catalog.open_catalog(Path(output_base))
 
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        print(f"Created directory: {output_dir}")
+    # 1. Get Title and Directory (always under Generated_Data).
+    # The catalog answers both for videos we have seen before, skipping yt-dlp.
+    known = catalog.get_video(conn, video_id)
+    clean_text = catalog.get_artifact(conn, video_id, "clean_text") if known else None
+    if known:
+        title = known["title"]
+        output_dir = str(catalog.resolve_path(conn, known["directory"]))
     else:
-        print(f"Directory already exists: {output_dir}")
-
-    # 2. Download Transcript
-    print(f"Processing: {title}...")
-    transcript = download_transcript(video_id, output_dir, title=title)
-
-    if not transcript:
-        print("Failed to process transcript.")
-        sys.exit(1)
-
-    print(f"Successfully saved files to: {output_dir}")
-
-    # 3. If style provided, run transform
-    if style:
-        style_file = os.path.join(project_root, "styles", f"{style}.md")
-        if not os.path.isfile(style_file):
-            print(f"Warning: Style guide not found: {style_file}")
-            print("Skipping transform. Available styles:")
-            styles_dir = os.path.join(project_root, "styles")
-            if os.path.isdir(styles_dir):
-                for f in sorted(os.listdir(styles_dir)):
-                    if f.endswith(".md"):
-                        print(f"  {f[:-3]}")
+        title = get_safe_title(video_id)
+        output_dir = os.path.join(output_base, title)
+
+    # 2. Download Transcript (unless the catalog already has it, possibly archived)
+    if clean_text and archive.exists(conn, catalog.resolve_path(conn, clean_text["path"])):
+        print(f"Transcript already downloaded: {title}")
+        # Backfill the marker for directories cataloged before it existed
+        if os.path.isdir(output_dir) and not os.path.exists(os.path.join(output_dir, catalog.VIDEO_ID_FILENAME)):
+            catalog.write_marker(Path(output_dir), video_id)
+    else:
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+            print(f"Created directory: {output_dir}")
         else:
-            transform_script = os.path.join(project_root, "transform_transcript.sh")
-            if os.path.isfile(transform_script):
-                result = subprocess.run(
-                    [transform_script, output_dir, style],
-                    cwd=project_root,
-                )
-                if result.returncode != 0:
-                    sys.exit(result.returncode)
-            else:
-                print(f"Warning: transform_transcript.sh not found at {transform_script}")
+            print(f"Directory already exists: {output_dir}")
+
+        print(f"Processing: {title}...")
+        transcript = download_transcript(video_id, output_dir, title=title, catalog_conn=conn)
+
+        if not transcript:
+            print("Failed to process transcript.")
+            sys.exit(1)
+
+        print(f"Successfully saved files to: {output_dir}")
+    conn.close()
+
+    # 3. If styles provided, run one transform that fans out across them
+    if styles:
+        transform_script = os.path.join(project_root, "transform_transcript.sh")
+        if os.path.isfile(transform_script):
+            result = subprocess.run(
+                [transform_script, output_dir, *styles],
+                cwd=project_root,
+            )
+            if result.returncode != 0:
+                sys.exit(result.returncode)
+        else:
+            print(f"Warning: transform_transcript.sh not found at {transform_script}")
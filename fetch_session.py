@@ -0,0 +1,241 @@
+"""Shared, throttled HTTP session for talking to YouTube.
+
+All fetch backends go through one pooled requests.Session and one global
+token-bucket limiter, so batch runs reuse connections and stay under
+YouTube's rate limits instead of tripping them and falling through to the
+slow yt-dlp path. A 429 halves the request rate and honours Retry-After;
+successes grow it back. Requests can optionally rotate across a proxy list,
+with failing proxies benched for an increasing cool-down.
+
+Configuration (environment or .env):
+  YOUTUBE_REQUESTS_PER_SECOND  sustained request rate (default 2, minimum 0.1)
+  YOUTUBE_BURST                bucket capacity (default 4, minimum 1)
+  YOUTUBE_PROXIES              comma-separated proxy URLs (default: none)
+"""
+
+import os
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+DEFAULT_RATE = 2.0
+DEFAULT_BURST = 4
+MIN_RATE = 0.1
+POOL_SIZE = 16
+MAX_ATTEMPTS = 4
+# Cool-down after a proxy failure, doubled per consecutive failure
+PROXY_COOLDOWN = 30.0
+PROXY_MAX_COOLDOWN = 600.0
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to 429 responses.
+
+    rate is clamped to at least MIN_RATE and capacity to at least 1 (a bucket
+    that can never hold a whole token would block forever).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        rate = max(MIN_RATE, rate)
+        capacity = max(1.0, capacity)
+        self.max_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> None:
+        """Block until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def penalize(self, retry_after: float | None = None) -> None:
+        """Back off after a 429: halve the rate and pause for Retry-After (or 1/rate)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.rate = max(MIN_RATE, self.rate / 2)
+            self._tokens = 0
+            pause = retry_after if retry_after is not None else 1 / self.rate
+            self._paused_until = max(self._paused_until, now + pause)
+
+    def reward(self) -> None:
+        """Grow the rate back toward its configured maximum after a success."""
+        with self._lock:
+            if self.rate < self.max_rate:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
+
+class ProxyPool:
+    """Round-robin over proxies, skipping ones cooling down after failures."""
+
+    def __init__(self, proxies: list[str]):
+        self.health = {
+            p: {"successes": 0, "failures": 0, "consecutive_failures": 0, "cooldown_until": 0.0}
+            for p in proxies
+        }
+        self._order = list(proxies)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self._order)
+
+    def choose(self) -> str | None:
+        """Next healthy proxy; the one recovering soonest if all are cooling down."""
+        with self._lock:
+            if not self._order:
+                return None
+            now = time.monotonic()
+            for i in range(len(self._order)):
+                proxy = self._order[(self._next + i) % len(self._order)]
+                if self.health[proxy]["cooldown_until"] <= now:
+                    self._next = (self._next + i + 1) % len(self._order)
+                    return proxy
+            return min(self._order, key=lambda p: self.health[p]["cooldown_until"])
+
+    def report(self, proxy: str | None, ok: bool) -> None:
+        if proxy is None:
+            return
+        with self._lock:
+            h = self.health[proxy]
+            if ok:
+                h["successes"] += 1
+                h["consecutive_failures"] = 0
+            else:
+                h["failures"] += 1
+                h["consecutive_failures"] += 1
+                cooldown = min(
+                    PROXY_MAX_COOLDOWN, PROXY_COOLDOWN * 2 ** (h["consecutive_failures"] - 1)
+                )
+                h["cooldown_until"] = time.monotonic() + cooldown
+
+
+def retry_after_seconds(value: str | None) -> float | None:
+    """Seconds from a Retry-After header value (None if missing or an HTTP date)."""
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+class ThrottledSession(requests.Session):
+    """requests.Session that rate-limits, retries 429s and rotates proxies."""
+
+    def __init__(self, limiter: TokenBucket, proxy_pool: ProxyPool | None = None):
+        super().__init__()
+        self.limiter = limiter
+        self.proxy_pool = proxy_pool or ProxyPool([])
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.limiter.acquire()
+            proxy = self.proxy_pool.choose()
+            if proxy is not None:
+                kwargs["proxies"] = {"http": proxy, "https": proxy}
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self.proxy_pool.report(proxy, False)
+                if attempt == MAX_ATTEMPTS or proxy is None:
+                    raise
+                continue
+
+            # A 429 means we are too fast, not that the proxy is down: slow the
+            # limiter but leave proxy health to connection failures
+            if response.status_code == 429:
+                self.limiter.penalize(retry_after_seconds(response.headers.get("Retry-After")))
+                if attempt < MAX_ATTEMPTS:
+                    response.close()
+                    continue
+                return response
+
+            self.limiter.reward()
+            self.proxy_pool.report(proxy, True)
+            return response
+
+
+def _env_float(name: str, default: float, minimum: float) -> float:
+    """Float setting from the environment; default if unset or invalid, clamped to minimum."""
+    raw = os.environ.get(name, "").strip()
+    try:
+        value = float(raw) if raw else default
+    except ValueError:
+        print(f"Warning: {name}={raw!r} is not a number, using {default}", file=sys.stderr)
+        return default
+    if not value >= minimum:
+        print(f"Warning: {name}={raw} is below {minimum}, using {minimum}", file=sys.stderr)
+        return minimum
+    return value
+
+
+_session: ThrottledSession | None = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> ThrottledSession:
+    """Process-wide YouTube session, created from the environment on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            proxies = [p.strip() for p in os.environ.get("YOUTUBE_PROXIES", "").split(",") if p.strip()]
+            limiter = TokenBucket(
+                _env_float("YOUTUBE_REQUESTS_PER_SECOND", DEFAULT_RATE, MIN_RATE),
+                _env_float("YOUTUBE_BURST", DEFAULT_BURST, 1),
+            )
+            _session = ThrottledSession(limiter, ProxyPool(proxies))
+        return _session
+
+
+def subprocess_proxy_args() -> list[str]:
+    """Throttle a non-session request (yt-dlp) and return its --proxy args, if any.
+
+    Subprocess outcomes are not reported to the proxy pool; only session
+    requests feed proxy health.
+    """
+    session = get_session()
+    session.limiter.acquire()
+    proxy = session.proxy_pool.choose()
+    return ["--proxy", proxy] if proxy else []
+
+
+def throttle_pytube() -> None:
+    """Take a limiter token before every request pytube sends.
+
+    pytube fetches with urllib through pytube.request._execute_request (watch
+    page, player JS, innertube API, caption track), so one fetch is several
+    requests; wrapping that function throttles each of them. Idempotent.
+    """
+    from pytube import request as pytube_request
+
+    if getattr(pytube_request._execute_request, "throttled", False):
+        return
+    execute = pytube_request._execute_request
+    limiter = get_session().limiter
+
+    def throttled_execute_request(*args, **kwargs):
+        limiter.acquire()
+        return execute(*args, **kwargs)
+
+    throttled_execute_request.throttled = True
+    pytube_request._execute_request = throttled_execute_request
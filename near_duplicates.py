@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Near-duplicate transcript detection with MinHash signatures and LSH.
+
+Re-uploads, mirrors and clips of the same talk produce nearly identical clean
+text. A MinHash signature over word shingles is computed when a transcript is
+downloaded and stored, banded, in an LSH index inside the catalog database.
+Before transforming, the pipeline looks up near-duplicates above a Jaccard
+threshold and reuses their output instead of making a full LLM call.
+
+Signatures use one-permutation hashing with rotation densification: each
+shingle is hashed once and binned, which keeps signing cost linear in the
+transcript length instead of linear in length x permutations.
+
+Usage:
+  python near_duplicates.py reindex             Sign every cataloged clean text
+  python near_duplicates.py bench [--docs N]    Benchmark signing and lookup cost
+"""
+
+import difflib
+import hashlib
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from array import array
+from pathlib import Path
+
+import archive
+import catalog
+
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 5
+DEFAULT_THRESHOLD = 0.8
+
+_BIN_BITS = 7  # log2(NUM_PERM)
+_VALUE_BITS = 64 - _BIN_BITS
+_VALUE_MASK = (1 << _VALUE_BITS) - 1
+_EMPTY = 1 << 64
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def get_threshold() -> float:
+    value = os.environ.get("NEAR_DUPLICATE_THRESHOLD", "").strip()
+    try:
+        return float(value) if value else DEFAULT_THRESHOLD
+    except ValueError:
+        return DEFAULT_THRESHOLD
+
+
+def shingle_hashes(text: str) -> set[int]:
+    """64-bit hashes of the overlapping SHINGLE_WORDS-word shingles in text."""
+    words = _WORD_RE.findall(text.lower())
+    span = min(SHINGLE_WORDS, len(words))
+    return {
+        int.from_bytes(
+            hashlib.blake2b(" ".join(words[i:i + span]).encode(), digest_size=8).digest(), "big"
+        )
+        for i in range(len(words) - span + 1)
+    } if words else set()
+
+
+def signature(text: str) -> array | None:
+    """MinHash signature of text, or None if it has no words."""
+    return _minhash(shingle_hashes(text))
+
+
+def _minhash(hashes: set[int]) -> array | None:
+    if not hashes:
+        return None
+
+    bins = [_EMPTY] * NUM_PERM
+    for h in hashes:
+        b = h >> _VALUE_BITS
+        v = h & _VALUE_MASK
+        if v < bins[b]:
+            bins[b] = v
+
+    # Rotation densification: an empty bin borrows the nearest non-empty bin
+    # to its right, tagged with the distance so borrowed values stay distinct.
+    sig = array("Q", [0] * NUM_PERM)
+    for i in range(NUM_PERM):
+        for t in range(NUM_PERM):
+            v = bins[(i + t) % NUM_PERM]
+            if v != _EMPTY:
+                sig[i] = (t << _VALUE_BITS) | v
+                break
+    return sig
+
+
+def estimate_jaccard(a: array, b: array) -> float:
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def _band_keys(sig: array) -> list[tuple[int, int]]:
+    keys = []
+    for band in range(BANDS):
+        chunk = sig[band * ROWS:(band + 1) * ROWS].tobytes()
+        bucket = int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "big", signed=True)
+        keys.append((band, bucket))
+    return keys
+
+
+def index_signature(conn: sqlite3.Connection, video_id: str, sig: array, shingles: int) -> None:
+    """Store a signature and its LSH buckets, replacing any previous entry."""
+    conn.execute("DELETE FROM lsh_buckets WHERE video_id = ?", (video_id,))
+    conn.execute(
+        "INSERT OR REPLACE INTO minhash_signatures (video_id, signature, shingles) VALUES (?, ?, ?)",
+        (video_id, sig.tobytes(), shingles),
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO lsh_buckets (band, bucket, video_id) VALUES (?, ?, ?)",
+        [(band, bucket, video_id) for band, bucket in _band_keys(sig)],
+    )
+
+
+def index_text(conn: sqlite3.Connection, video_id: str, text: str) -> None:
+    hashes = shingle_hashes(text)
+    sig = _minhash(hashes)
+    if sig is not None:
+        index_signature(conn, video_id, sig, len(hashes))
+
+
+def find_near_duplicates(
+    conn: sqlite3.Connection,
+    sig: array,
+    threshold: float,
+    exclude: str | None = None,
+) -> list[tuple[str, float]]:
+    """Indexed videos whose estimated Jaccard similarity to sig is >= threshold.
+
+    Returns: [(video_id, estimated_jaccard), ...], most similar first.
+    """
+    candidates = set()
+    for band, bucket in _band_keys(sig):
+        candidates.update(
+            row[0] for row in conn.execute(
+                "SELECT video_id FROM lsh_buckets WHERE band = ? AND bucket = ?", (band, bucket)
+            )
+        )
+    candidates.discard(exclude)
+
+    matches = []
+    for video_id in candidates:
+        blob = conn.execute(
+            "SELECT signature FROM minhash_signatures WHERE video_id = ?", (video_id,)
+        ).fetchone()[0]
+        other = array("Q")
+        other.frombytes(blob)
+        score = estimate_jaccard(sig, other)
+        if score >= threshold:
+            matches.append((video_id, score))
+    matches.sort(key=lambda m: m[1], reverse=True)
+    return matches
+
+
+def find_transformed_duplicate(
+    conn: sqlite3.Connection,
+    sig: array | None,
+    style_name: str,
+    threshold: float,
+    exclude: str | None = None,
+) -> tuple[str, float, Path, Path | None] | None:
+    """Most similar near-duplicate that already has an output for style_name.
+
+    sig is the signature() of the full clean text; compute it once per video
+    and reuse it across styles.
+
+    Returns: (video_id, estimated_jaccard, output_path, clean_text_path) or None.
+    """
+    if sig is None:
+        return None
+    for video_id, score in find_near_duplicates(conn, sig, threshold, exclude=exclude):
+        output = catalog.get_artifact(conn, video_id, f"style:{style_name}")
+        if output is None:
+            continue
+        output_path = catalog.resolve_path(conn, output["path"])
+        if not archive.exists(conn, output_path):
+            continue
+        clean = catalog.get_artifact(conn, video_id, "clean_text")
+        clean_path = catalog.resolve_path(conn, clean["path"]) if clean else None
+        return video_id, score, output_path, clean_path
+    return None
+
+
+def transcript_diff(old_text: str, new_text: str) -> str:
+    """Unified diff between two clean texts, one sentence per line."""
+    def split(text):
+        return [s + "\n" for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    return "".join(difflib.unified_diff(split(old_text), split(new_text), "previous", "current", n=1))
+
+
+def reindex(base_dir: Path) -> int:
+    """Sign every cataloged clean text. Returns the number indexed."""
+    conn = catalog.open_catalog(base_dir)
+    rows = conn.execute("SELECT video_id, path FROM artifacts WHERE kind = 'clean_text'").fetchall()
+    count = 0
+    with conn:
+        for row in rows:
+            path = catalog.resolve_path(conn, row["path"])
+            if not archive.exists(conn, path):
+                continue
+            index_text(conn, row["video_id"], archive.read_text(conn, path))
+            count += 1
+    conn.close()
+    return count
+
+
+def _synthetic_corpus(num_docs: int, words_per_doc: int, dup_rate: float, seed: int = 0):
+    """Random documents; dup_rate of them are lightly edited copies of earlier ones.
+
+    Yields (doc_id, text, original_id_or_None).
+    """
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(20_000)]
+    docs = []
+    for i in range(num_docs):
+        if docs and rng.random() < dup_rate:
+            src = rng.randrange(len(docs))
+            words = list(docs[src])
+            # Edit ~0.5% of words, like a re-upload with a different intro line
+            for _ in range(max(1, len(words) // 200)):
+                words[rng.randrange(len(words))] = rng.choice(vocab)
+            original = f"doc{src}"
+        else:
+            words = rng.choices(vocab, k=words_per_doc)
+            original = None
+        docs.append(words)
+        yield f"doc{i}", " ".join(words), original
+
+
+def bench(num_docs: int, words_per_doc: int = 300, queries: int = 1000) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        conn = catalog.open_catalog(Path(tmpdir))
+        planted = {}
+        sign_time = 0.0
+        index_time = 0.0
+        with conn:
+            for doc_id, text, original in _synthetic_corpus(num_docs, words_per_doc, 0.05):
+                start = time.perf_counter()
+                sig = signature(text)
+                sign_time += time.perf_counter() - start
+                start = time.perf_counter()
+                index_signature(conn, doc_id, sig, 0)
+                index_time += time.perf_counter() - start
+                if original is not None:
+                    planted[doc_id] = (original, sig)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db_size = os.path.getsize(Path(tmpdir) / catalog.CATALOG_FILENAME)
+
+        sample = list(planted.items())[:queries]
+        lookup_times = []
+        found = 0
+        for doc_id, (original, sig) in sample:
+            start = time.perf_counter()
+            matches = find_near_duplicates(conn, sig, DEFAULT_THRESHOLD, exclude=doc_id)
+            lookup_times.append(time.perf_counter() - start)
+            if any(m[0] == original for m in matches):
+                found += 1
+        conn.close()
+
+    lookup_times.sort()
+    p50 = lookup_times[len(lookup_times) // 2] * 1000 if lookup_times else 0.0
+    p99 = lookup_times[int(len(lookup_times) * 0.99)] * 1000 if lookup_times else 0.0
+    print(f"Corpus: {num_docs} docs x {words_per_doc} words, {len(planted)} planted near-duplicates")
+    print(f"Signature: {sign_time / num_docs * 1000:.3f} ms/doc ({sign_time:.1f}s total)")
+    print(f"Index insert: {index_time / num_docs * 1000:.3f} ms/doc, index size {db_size / 1e6:.1f} MB")
+    print(f"Lookup ({len(sample)} queries): p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    if sample:
+        print(f"Recall of planted duplicates at J>={DEFAULT_THRESHOLD}: {found / len(sample):.1%}")
+
+
+def main() -> int:
+    script_dir = Path(__file__).resolve().parent
+    if len(sys.argv) < 2 or sys.argv[1] not in ("reindex", "bench"):
+        print(__doc__.split("Usage:")[1].rstrip(), file=sys.stderr)
+        return 1
+
+    if sys.argv[1] == "reindex":
+        count = reindex(script_dir / "Generated_Data")
+        print(f"Indexed {count} transcripts")
+        return 0
+
+    num_docs = 50_000
+    if "--docs" in sys.argv:
+        num_docs = int(sys.argv[sys.argv.index("--docs") + 1])
+    bench(num_docs)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,305 @@
+"""Prompt assembly for transcript transforms.
+
+The style guide goes into a stable system-message prefix so provider-side
+prompt caching can reuse it across videos; the transcript follows as the
+user message. When one transcript fans out to several styles the layout is
+flipped so the transcript is the shared prefix instead. Tokens are counted
+locally before sending and transcripts are trimmed to fit
+TRANSCRIPT_TOKEN_BUDGET (env) when needed.
+"""
+
+import json
+import math
+import os
+import re
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+try:
+    # Downloads the BPE file on first use; offline without a cached copy this
+    # fails with a network error, so fall back to estimates on any failure
+    _ENCODING = tiktoken.get_encoding("o200k_base") if tiktoken else None
+except Exception:
+    _ENCODING = None
+
+
+DEFAULT_TOKEN_BUDGET = 120_000
+
+INSTRUCTIONS = (
+    "Transform the transcript in the next message according to the style guide above. "
+    "Output ONLY the transformed document, no commentary or meta-discussion."
+)
+
+# Fan-out layout: the transcript is the shared prefix, the style guide varies
+SHARED_TRANSCRIPT_INSTRUCTIONS = (
+    "Transform the transcript above according to the style guide in the next message. "
+    "Output ONLY the transformed document, no commentary or meta-discussion."
+)
+
+DIFF_INSTRUCTIONS = (
+    "The document in the next message was produced from an earlier version of this "
+    "transcript using the style guide above. The transcript has since changed as shown "
+    "in the unified diff that follows it. Update the document to reflect those changes "
+    "and output the complete updated document ONLY, no commentary or meta-discussion."
+)
+
+# Providers on OpenRouter that only cache when the prompt carries explicit
+# cache_control breakpoints. Others (OpenAI, DeepSeek, ...) cache prefixes
+# automatically, so a plain string system message is enough for them.
+CACHE_CONTROL_PREFIXES = ("anthropic/", "google/")
+
+# Filler words that carry no content for the transform. Longest alternative
+# first so "uh-huh" is not cut down to "-huh". Repeated words are left alone:
+# "I had had enough" is not a stutter.
+_FILLER_RE = re.compile(r"\b(?:uh-huh|um+|uh+|erm+)\b[,.]?\s*", re.IGNORECASE)
+
+# Per-message overhead the chat template adds around each message.
+_MESSAGE_OVERHEAD = 8
+
+
+def get_token_budget() -> int:
+    value = os.environ.get("TRANSCRIPT_TOKEN_BUDGET", "").strip()
+    if not value:
+        return DEFAULT_TOKEN_BUDGET
+    try:
+        return int(value)
+    except ValueError:
+        return DEFAULT_TOKEN_BUDGET
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens locally (tiktoken when installed, ~4 chars/token otherwise)."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / 4)
+
+
+def compress_transcript(text: str) -> str:
+    """Drop filler words and redundant whitespace, keeping paragraphs."""
+    paragraphs = []
+    for paragraph in text.split("\n\n"):
+        paragraph = _FILLER_RE.sub("", paragraph)
+        paragraph = re.sub(r"\s+", " ", paragraph).strip()
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def _split_piece(text: str, limit: int) -> list[str]:
+    """Split text into pieces of at most ~limit tokens, on sentences then words."""
+    if count_tokens(text) <= limit:
+        return [text]
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        cost = count_tokens(sentence)
+        if cost <= limit:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        step = max(1, len(words) * limit // cost)
+        pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+    return pieces
+
+
+def _truncate_words(text: str, max_tokens: int, from_end: bool = False) -> str:
+    """Longest run of whole words from the start (or end) of text within max_tokens."""
+    words = text.split()
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        part = words[-mid:] if from_end else words[:mid]
+        if count_tokens(" ".join(part)) + 1 <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    if lo == 0:
+        return ""
+    return " ".join(words[-lo:] if from_end else words[:lo])
+
+
+def fit_transcript(transcript: str, max_tokens: int) -> tuple[str, bool]:
+    """Fit a transcript into max_tokens.
+
+    Returns the transcript unchanged when it already fits. Otherwise it is
+    compressed, and if still too long the middle is dropped so the opening and
+    the conclusion both survive. Paragraphs too long to keep whole (or a
+    transcript with no paragraph breaks at all) are cut at sentence, then word
+    boundaries, so the budget is filled rather than left empty. The result
+    never exceeds max_tokens; a budget too small for the omission marker gets
+    just the opening words. The bool reports whether the returned text
+    differs from the input.
+    """
+    if count_tokens(transcript) <= max_tokens:
+        return transcript, False
+
+    compressed = compress_transcript(transcript)
+    if count_tokens(compressed) <= max_tokens:
+        return compressed, True
+
+    marker_cost = 20
+    if max_tokens <= marker_cost:
+        # No room for the marker: keep as much of the opening as fits
+        return _truncate_words(compressed, max_tokens), True
+    remaining = max_tokens - marker_cost
+    # (paragraph index, text); pieces of one paragraph are rejoined with spaces
+    piece_limit = max(1, remaining // 16)
+    pieces = [
+        (n, piece)
+        for n, paragraph in enumerate(compressed.split("\n\n"))
+        for piece in _split_piece(paragraph, piece_limit)
+    ]
+    costs = [count_tokens(text) + 1 for _, text in pieces]
+    head: list[tuple[int, str]] = []
+    tail: list[tuple[int, str]] = []
+    lo, hi = 0, len(pieces) - 1
+    take_head = True
+    while lo <= hi and remaining > 0:
+        idx = lo if take_head else hi
+        if costs[idx] > remaining:
+            # Fill what is left with part of the piece that did not fit
+            partial = _truncate_words(pieces[idx][1], remaining, from_end=not take_head)
+            if partial:
+                (head if take_head else tail).append((pieces[idx][0], partial))
+            break
+        remaining -= costs[idx]
+        if take_head:
+            head.append(pieces[idx])
+            lo += 1
+        else:
+            tail.append(pieces[idx])
+            hi -= 1
+        take_head = not take_head
+
+    def join(kept: list[tuple[int, str]]) -> str:
+        out = ""
+        for i, (n, text) in enumerate(kept):
+            if i:
+                out += " " if kept[i - 1][0] == n else "\n\n"
+            out += text
+        return out
+
+    tail.reverse()
+    omitted = len(compressed.split()) - sum(len(text.split()) for _, text in head + tail)
+    marker = f"[... {omitted} words omitted to fit the token budget ...]"
+    return "\n\n".join(part for part in (join(head), marker, join(tail)) if part), True
+
+
+def supports_cache_control(model: str) -> bool:
+    return model.startswith(CACHE_CONTROL_PREFIXES)
+
+
+def _system_content(system_text: str, model: str) -> str | list[dict]:
+    if supports_cache_control(model):
+        return [{"type": "text", "text": system_text, "cache_control": {"type": "ephemeral"}}]
+    return system_text
+
+
+def build_messages(
+    style_content: str,
+    transcript_content: str,
+    model: str,
+    token_budget: int | None = None,
+    shared_prefix: str = "style",
+) -> tuple[list[dict], dict]:
+    """Build chat messages with a cacheable shared prefix.
+
+    shared_prefix="style" (default) puts the style guide first so it is reused
+    across videos. shared_prefix="transcript" puts the transcript first so it
+    is reused across styles of the same video (multi-style fan-out).
+
+    Returns: (messages, info) where info holds the local token counts and
+    whether the transcript was trimmed.
+    """
+    budget = token_budget if token_budget is not None else get_token_budget()
+    transcript_header = "# Transcript to Transform\n\n"
+    if shared_prefix == "transcript":
+        overhead = f"\n\n---\n\n{SHARED_TRANSCRIPT_INSTRUCTIONS}"
+        prefix_tokens = (
+            count_tokens(transcript_header + overhead) + count_tokens(style_content)
+            + 2 * _MESSAGE_OVERHEAD
+        )
+        transcript, trimmed = fit_transcript(transcript_content, max(budget - prefix_tokens, 0))
+        system_text = transcript_header + transcript + overhead
+        messages = [
+            {"role": "system", "content": _system_content(system_text, model)},
+            {"role": "user", "content": style_content},
+        ]
+    else:
+        system_text = f"{style_content}\n\n---\n\n{INSTRUCTIONS}"
+        prefix_tokens = count_tokens(system_text) + count_tokens(transcript_header) + 2 * _MESSAGE_OVERHEAD
+        transcript, trimmed = fit_transcript(transcript_content, max(budget - prefix_tokens, 0))
+        messages = [
+            {"role": "system", "content": _system_content(system_text, model)},
+            {"role": "user", "content": transcript_header + transcript},
+        ]
+    info = {
+        "prefix_tokens": prefix_tokens,
+        "prompt_tokens_estimate": prefix_tokens + count_tokens(transcript),
+        "trimmed": trimmed,
+    }
+    return messages, info
+
+
+def build_diff_messages(
+    style_content: str,
+    previous_output: str,
+    transcript_diff: str,
+    model: str,
+    token_budget: int | None = None,
+) -> tuple[list[dict], dict]:
+    """Messages for a cheap update of an existing output from a transcript diff.
+
+    A diff cannot be trimmed without silently dropping changes, so instead of
+    fitting it the way fit_transcript does, info["fits"] reports whether the
+    whole prompt is within the token budget; callers run a full (trimmed)
+    transform when it is not.
+
+    Returns: (messages, info) with info holding the local token estimate.
+    """
+    budget = token_budget if token_budget is not None else get_token_budget()
+    system_text = f"{style_content}\n\n---\n\n{DIFF_INSTRUCTIONS}"
+    user_content = (
+        f"# Previous Document\n\n{previous_output}\n\n"
+        f"# Transcript Diff\n\n```diff\n{transcript_diff}```"
+    )
+    messages = [
+        {"role": "system", "content": _system_content(system_text, model)},
+        {"role": "user", "content": user_content},
+    ]
+    estimate = count_tokens(system_text) + count_tokens(user_content) + 2 * _MESSAGE_OVERHEAD
+    info = {"prompt_tokens_estimate": estimate, "fits": estimate <= budget}
+    return messages, info
+
+
+def extract_usage(response) -> dict:
+    """Pull token counts, cached tokens and cost (when reported) from a response."""
+    usage = {}
+    if not response.usage:
+        return usage
+    usage = {
+        "prompt_tokens": response.usage.prompt_tokens,
+        "completion_tokens": response.usage.completion_tokens,
+        "total_tokens": response.usage.total_tokens,
+    }
+    details = getattr(response.usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details else None
+    usage["cached_tokens"] = cached or 0
+    # OpenRouter reports cost as an extra field when usage accounting is on
+    cost = getattr(response.usage, "cost", None)
+    if cost is not None:
+        usage["cost"] = cost
+    return usage
+
+
+def record_usage(log_file: Path, entry: dict) -> None:
+    """Append one usage record (JSON line) to log_file."""
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+    record = {"timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), **entry}
+    with open(log_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
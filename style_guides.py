@@ -0,0 +1,29 @@
+"""Style guide lookup shared by download_transcript.py and transform_transcript.py."""
+
+import sys
+from pathlib import Path
+
+
+def resolve_styles(names: list[str], styles_dir: Path) -> list[str]:
+    """Expand comma-separated names and "all" into an ordered, de-duplicated list."""
+    styles = []
+    for name in (n.strip() for arg in names for n in arg.split(",")):
+        if not name:
+            continue
+        expanded = sorted(f.stem for f in styles_dir.glob("*.md")) if name == "all" else [name]
+        for style in expanded:
+            if style not in styles:
+                styles.append(style)
+    return styles
+
+
+def missing_styles(styles: list[str], styles_dir: Path) -> list[Path]:
+    """Style guide files that do not exist, in the order given."""
+    return [styles_dir / f"{s}.md" for s in styles if not (styles_dir / f"{s}.md").is_file()]
+
+
+def print_available_styles(styles_dir: Path) -> None:
+    if styles_dir.is_dir():
+        print("Available styles:", file=sys.stderr)
+        for f in sorted(styles_dir.glob("*.md")):
+            print(f"  {f.stem}", file=sys.stderr)
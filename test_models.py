@@ -20,6 +20,11 @@ except ImportError:
 
 from openai import APIError, OpenAI
 
+import archive
+import catalog
+from prompts import build_messages, extract_usage
+from transform_transcript import find_clean_text
+
 OPENROUTER_BASE = "https://openrouter.ai/api/v1"
 
 # Default models to test
@@ -39,13 +44,6 @@ def get_api_key():
     return key.strip()
 
 
-def find_clean_text(video_dir: Path) -> Path | None:
-    for f in video_dir.iterdir():
-        if f.is_file() and f.name.endswith("_clean_text.txt"):
-            return f
-    return None
-
-
 def transform_with_model(
     model: str,
     style_content: str,
@@ -56,33 +54,23 @@ def transform_with_model(
     
     Returns: (content, elapsed_seconds, usage_info)
     """
-    user_content = (
-        f"{style_content}\n\n---\n\n# Transcript to Transform\n\n{transcript_content}\n\n"
-        "Transform the above transcript according to the style guide. "
-        "Output ONLY the transformed document, no commentary or meta-discussion."
-    )
+    messages, _ = build_messages(style_content, transcript_content, model)
     
     client = OpenAI(base_url=OPENROUTER_BASE, api_key=api_key)
     
     start = time.time()
     response = client.chat.completions.create(
         model=model,
-        messages=[{"role": "user", "content": user_content}],
-        extra_body={"reasoning": {"enabled": True}},
+        messages=messages,
+        extra_body={"reasoning": {"enabled": True}, "usage": {"include": True}},
     )
     elapsed = time.time() - start
     
     message = response.choices[0].message
     content = (message.content or "").strip()
     
-    # Extract usage info if available
-    usage = {}
-    if response.usage:
-        usage = {
-            "prompt_tokens": response.usage.prompt_tokens,
-            "completion_tokens": response.usage.completion_tokens,
-            "total_tokens": response.usage.total_tokens,
-        }
+    # Extract usage info if available (includes cached tokens and cost)
+    usage = extract_usage(response)
     
     return content, elapsed, usage
 
@@ -115,14 +103,15 @@ def main() -> int:
     output_base = script_dir / "Generated_Data"
     
     # Validate inputs
-    if not video_dir.is_dir():
+    conn = catalog.open_catalog(output_base)
+    if not video_dir.is_dir() and not archive.is_archived(conn, video_dir):
         print(f"Error: Directory not found: {video_dir}", file=sys.stderr)
         return 1
     if not style_file.is_file():
         print(f"Error: Style guide not found: {style_file}", file=sys.stderr)
         return 1
     
-    clean_text_path = find_clean_text(video_dir)
+    clean_text_path = find_clean_text(video_dir, conn)
     if not clean_text_path:
         print(f"Error: No *_clean_text.txt found in {video_dir}", file=sys.stderr)
         return 1
@@ -140,7 +129,7 @@ def main() -> int:
     today = date.today().isoformat()
     
     style_content = style_file.read_text(encoding="utf-8")
-    transcript_content = clean_text_path.read_text(encoding="utf-8")
+    transcript_content = archive.read_text(conn, clean_text_path)
     
     print(f"Testing {len(models)} models on: {title}")
     print(f"Style: {style_name}")
@@ -196,7 +185,7 @@ tags:
             print(f"OK ({elapsed:.1f}s)")
             print(f"  Output: {lines} lines, {chars} chars")
             if usage:
-                print(f"  Tokens: {usage.get('prompt_tokens', '?')} in, {usage.get('completion_tokens', '?')} out")
+                print(f"  Tokens: {usage.get('prompt_tokens', '?')} in ({usage.get('cached_tokens', 0)} cached), {usage.get('completion_tokens', '?')} out")
             print(f"  File: {output_file.name}")
             
             results.append({
@@ -0,0 +1,103 @@
+"""Local stand-in for the OpenRouter chat completions endpoint.
+
+Serves scripted responses per model so the transform pipeline can be run
+end to end without network access or an API key. A script maps a model name
+to either the content to return or an HTTP error status; unscripted models
+get DEFAULT_CONTENT.
+
+Usage: python tests/stub_openrouter.py [port]
+Then point transform_transcript.OPENROUTER_BASE at http://127.0.0.1:<port>/v1.
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_CONTENT = "## 1. Overview\n\nStub output.\n\n## 2. Steps\n\n1. Do the thing.\n"
+
+USAGE = {
+    "prompt_tokens": 100,
+    "completion_tokens": 50,
+    "total_tokens": 150,
+    "cost": 0.001,
+    "prompt_tokens_details": {"cached_tokens": 80},
+}
+
+
+class StubOpenRouter:
+    """OpenAI-compatible chat completions server on a background thread.
+
+    script: {model: content_str | http_status_int}. Every request body is
+    appended to .requests on arrival; .spans gets (body, start, end) monotonic
+    times once it is answered, after waiting `delay` seconds.
+    """
+
+    def __init__(self, script: dict | None = None, port: int = 0, delay: float = 0.0):
+        self.script = script or {}
+        self.delay = delay
+        self.requests: list[dict] = []
+        self.spans: list[tuple[dict, float, float]] = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                start = time.monotonic()
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stub.requests.append(body)
+                time.sleep(stub.delay)
+                reply = stub.script.get(body["model"], DEFAULT_CONTENT)
+                if isinstance(reply, int):
+                    status = reply
+                    payload = {"error": {"message": f"scripted {reply}", "code": reply}}
+                else:
+                    status = 200
+                    payload = {
+                        "id": "stub",
+                        "object": "chat.completion",
+                        "created": 0,
+                        "model": body["model"],
+                        "choices": [{
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "message": {"role": "assistant", "content": reply},
+                        }],
+                        "usage": USAGE,
+                    }
+                out = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+                stub.spans.append((body, start, time.monotonic()))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def models_called(self) -> list[str]:
+        return [r["model"] for r in self.requests]
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    with StubOpenRouter(port=port) as stub:
+        print(f"Serving stub OpenRouter at {stub.base_url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
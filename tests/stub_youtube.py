@@ -0,0 +1,81 @@
+"""Local stand-in for YouTube's rate limiting.
+
+Allows a fixed number of GETs per second and answers 429 with Retry-After
+beyond that. It also serves absolute-URL requests, so the same server works
+as an HTTP proxy.
+
+Usage: python tests/stub_youtube.py [port] [requests_per_second]
+"""
+
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RateLimitedServer(ThreadingHTTPServer):
+    """Serves on a background thread when used as a context manager.
+
+    .served counts responses by status code.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, allow: float, port: int = 0, retry_after: float = 1.0):
+        self.allow = allow
+        self.retry_after = retry_after
+        self.served: Counter = Counter()
+        self._recent: deque = deque()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                limited = server.over_limit()
+                body = b"rate limited" if limited else b"ok"
+                self.send_response(429 if limited else 200)
+                if limited:
+                    self.send_header("Retry-After", f"{server.retry_after:g}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server_address[1]}"
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def over_limit(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and self._recent[0] <= now - 1:
+                self._recent.popleft()
+            limited = len(self._recent) >= self.allow
+            if not limited:
+                self._recent.append(now)
+            self.served[429 if limited else 200] += 1
+            return limited
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8766
+    allow = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    with RateLimitedServer(allow, port) as server:
+        print(f"Serving {allow:g} req/s at {server.url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
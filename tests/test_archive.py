@@ -0,0 +1,97 @@
+"""Tests for archive.py: pack -> read -> unpack must return every byte.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import hashlib
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import archive
+import catalog
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        self.video_dir = self.base / "Some_Title"
+        comparison = self.video_dir / "model_comparison"
+        comparison.mkdir(parents=True)
+        text = " ".join(f"sentence {i} about building a shelf." for i in range(2000))
+        self.files = {
+            self.video_dir / "Some_Title_clean_text.txt": text.encode(),
+            self.video_dir / "Some_Title_formatted_transcript.txt": "0.00|héllo wörld\n".encode() * 500,
+            self.video_dir / "Some_Title_coding_agent.md": b"---\nmodel: m\n---\n\n### 1. Overview\n",
+            comparison / "Some_Title_coding_agent_gemini.md": b"# Comparison output\n" * 50,
+            self.video_dir / "empty.txt": b"",
+            self.video_dir / catalog.VIDEO_ID_FILENAME: b"abcdefghijk\n",
+        }
+        for path, data in self.files.items():
+            path.write_bytes(data)
+        self.conn = catalog.open_catalog(self.base)
+        self.addCleanup(self.conn.close)
+        with self.conn:
+            catalog.record_video(self.conn, "abcdefghijk", "Some_Title", self.video_dir)
+            catalog.record_artifact(
+                self.conn, "abcdefghijk", "clean_text", self.video_dir / "Some_Title_clean_text.txt"
+            )
+        self.addCleanup(archive._dict_cache.clear)
+        self.addCleanup(archive._decompressors.clear)
+
+    def round_trip(self):
+        archive._dict_cache.clear()
+        archive._decompressors.clear()
+        with self.conn:
+            dict_id = archive.train_dictionary(self.conn, list(self.files.values()) * 20)
+        self.assertIsNotNone(dict_id)
+        raw, packed = archive.pack_video(self.conn, "abcdefghijk", dict_id)
+        self.assertEqual(raw, sum(len(d) for d in self.files.values()))
+        self.assertFalse(self.video_dir.exists())
+        self.assertTrue(archive.is_archived(self.conn, self.video_dir))
+
+        # Recorded hashes match the originals, and reads come back byte for byte
+        entries = {
+            row["relpath"]: row["sha256"]
+            for row in self.conn.execute("SELECT relpath, sha256 FROM archive_entries")
+        }
+        self.assertEqual(len(entries), len(self.files))
+        for path, data in self.files.items():
+            self.assertEqual(entries[catalog.relative_path(self.conn, path)], sha256(data))
+            self.assertTrue(archive.exists(self.conn, path))
+            self.assertEqual(archive.read_bytes(self.conn, path), data)
+        clean = self.video_dir / "Some_Title_clean_text.txt"
+        self.assertEqual(archive.read_text(self.conn, clean), self.files[clean].decode())
+
+        # Fresh caches, as in a new process
+        archive._dict_cache.clear()
+        archive._decompressors.clear()
+        self.assertEqual(archive.unpack_video(self.conn, "abcdefghijk"), len(self.files))
+        for path, data in self.files.items():
+            self.assertEqual(sha256(path.read_bytes()), sha256(data))
+        self.assertFalse(archive.is_archived(self.conn, self.video_dir))
+
+    @unittest.skipIf(archive.zstandard is None, "zstandard not installed")
+    def test_zstd(self):
+        self.assertEqual(archive.default_codec(), "zstd")
+        self.round_trip()
+
+    def test_zlib(self):
+        with mock.patch.object(archive, "zstandard", None):
+            self.assertEqual(archive.default_codec(), "zlib")
+            self.round_trip()
+
+    def test_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            archive.read_bytes(self.conn, self.video_dir / "nope.txt")
+
+
+if __name__ == "__main__":
+    unittest.main()
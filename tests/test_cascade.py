@@ -0,0 +1,158 @@
+"""Tests for cascade.py: local validation and model escalation.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import json
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from unittest import mock
+
+import transform_transcript
+from cascade import transform_with_cascade, validate_output
+from openai import APIError
+from stub_openrouter import DEFAULT_CONTENT, StubOpenRouter
+
+
+STYLE = """# Test Style
+
+## Output Format
+
+### 1. Overview
+One paragraph.
+
+### 2. Steps
+Numbered steps.
+"""
+
+TRANSCRIPT = "In this video we set up the project and run the tests."
+
+MODELS = ["cheap/model", "mid/model", "strong/model"]
+
+MISSING_HEADINGS = "Just a paragraph with no section headings at all."
+WITH_FRONT_MATTER = "---\ntitle: x\n---\n\n" + DEFAULT_CONTENT
+FENCED = "```markdown\n" + DEFAULT_CONTENT + "```\n"
+
+
+class ValidateOutputTest(unittest.TestCase):
+    def test_accepts_output_with_expected_sections(self):
+        self.assertEqual(validate_output(DEFAULT_CONTENT, STYLE, TRANSCRIPT), [])
+
+    def test_empty_output(self):
+        self.assertEqual(validate_output("  \n", STYLE, TRANSCRIPT), ["empty output"])
+
+    def test_missing_headings(self):
+        failures = validate_output(MISSING_HEADINGS, STYLE, TRANSCRIPT)
+        self.assertEqual(failures, ["headings: 0/2 expected sections present"])
+
+    def test_heading_alternatives_match_first_name(self):
+        style = "### 1. Materials List / BOM\n### 2. Steps\n"
+        body = "## Materials List\n\nwood\n\n## Steps\n\ncut\n"
+        self.assertEqual(validate_output(body, style, TRANSCRIPT), [])
+
+    def test_own_front_matter(self):
+        failures = validate_output(WITH_FRONT_MATTER, STYLE, TRANSCRIPT)
+        self.assertEqual(failures, ["front matter: output starts with its own front matter block"])
+
+    def test_code_fence(self):
+        failures = validate_output(FENCED, STYLE, TRANSCRIPT)
+        self.assertEqual(failures, ["front matter: output is wrapped in a code fence"])
+
+    def test_length_ratio_only_checked_for_long_transcripts(self):
+        long_transcript = "word " * 1000
+        failures = validate_output(DEFAULT_CONTENT, STYLE, long_transcript)
+        self.assertEqual(len(failures), 1)
+        self.assertTrue(failures[0].startswith("length ratio"))
+        self.assertEqual(validate_output(DEFAULT_CONTENT, STYLE, "word " * 100), [])
+
+
+class CascadeTest(unittest.TestCase):
+    """transform_with_cascade driven through transform_with_openrouter and a stub server."""
+
+    def run_cascade(self, script: dict):
+        with StubOpenRouter(script) as stub, tempfile.TemporaryDirectory() as tmpdir:
+            log_file = Path(tmpdir) / "usage_log.jsonl"
+            with mock.patch.object(transform_transcript, "OPENROUTER_BASE", stub.base_url), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    result = transform_with_cascade(
+                        STYLE,
+                        TRANSCRIPT,
+                        "test-key",
+                        partial(transform_transcript.transform_with_openrouter, shared_prefix="style"),
+                        models=MODELS,
+                        log_file=log_file,
+                        log_context={"style": "test"},
+                    )
+                    error = None
+                except Exception as e:
+                    result, error = None, e
+            log = [json.loads(line) for line in log_file.read_text().splitlines()] if log_file.exists() else []
+            return result, error, stub.models_called(), log
+
+    def test_accepts_first_model(self):
+        (content, usage), error, called, log = self.run_cascade({})
+        self.assertIsNone(error)
+        self.assertEqual(called, ["cheap/model"])
+        self.assertEqual(content, DEFAULT_CONTENT.strip())
+        self.assertEqual(usage["model"], "cheap/model")
+        self.assertEqual(usage["attempts"], 1)
+        self.assertEqual(usage["cached_tokens"], 80)
+        self.assertEqual([e["routing"] for e in log], ["accepted"])
+        self.assertEqual(log[0]["style"], "test")
+
+    def test_escalates_on_missing_headings(self):
+        (content, usage), error, called, log = self.run_cascade({"cheap/model": MISSING_HEADINGS})
+        self.assertIsNone(error)
+        self.assertEqual(called, ["cheap/model", "mid/model"])
+        self.assertEqual(usage["model"], "mid/model")
+        self.assertEqual(usage["attempts"], 2)
+        self.assertEqual([e["routing"] for e in log], ["escalated", "accepted"])
+        self.assertEqual(log[0]["failures"], ["headings: 0/2 expected sections present"])
+
+    def test_escalates_on_front_matter(self):
+        (content, usage), error, called, log = self.run_cascade(
+            {"cheap/model": WITH_FRONT_MATTER, "mid/model": FENCED}
+        )
+        self.assertIsNone(error)
+        self.assertEqual(called, MODELS)
+        self.assertEqual(usage["model"], "strong/model")
+        self.assertEqual([e["routing"] for e in log], ["escalated", "escalated", "accepted"])
+
+    def test_escalates_on_error(self):
+        (content, usage), error, called, log = self.run_cascade({"cheap/model": 400})
+        self.assertIsNone(error)
+        self.assertEqual(usage["model"], "mid/model")
+        self.assertTrue(log[0]["failures"][0].startswith("error:"))
+
+    def test_exhausted_returns_last_output(self):
+        script = {model: MISSING_HEADINGS + f" ({model})" for model in MODELS}
+        (content, usage), error, called, log = self.run_cascade(script)
+        self.assertIsNone(error)
+        self.assertEqual(called, MODELS)
+        self.assertEqual(content, script["strong/model"])
+        self.assertEqual(usage["model"], "strong/model")
+        self.assertEqual(usage["attempts"], 3)
+        self.assertEqual([e["routing"] for e in log], ["escalated", "escalated", "exhausted"])
+
+    def test_exhausted_falls_back_to_earlier_output_when_last_errors(self):
+        script = {"cheap/model": MISSING_HEADINGS, "mid/model": 400, "strong/model": 400}
+        (content, usage), error, called, log = self.run_cascade(script)
+        self.assertIsNone(error)
+        self.assertEqual(content, MISSING_HEADINGS)
+        self.assertEqual(usage["model"], "cheap/model")
+
+    def test_reraises_when_every_model_errors(self):
+        result, error, called, log = self.run_cascade({model: 400 for model in MODELS})
+        self.assertIsNone(result)
+        self.assertIsInstance(error, APIError)
+        self.assertEqual(called, MODELS)
+        self.assertEqual([e["routing"] for e in log], ["escalated", "escalated", "exhausted"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Tests for catalog.py: rebuilding the catalog from disk.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import archive
+import catalog
+
+
+class RebuildTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        self.video_dir = self.base / "Some_Title"
+        self.video_dir.mkdir()
+        self.clean = self.video_dir / "Some_Title_clean_text.txt"
+        self.clean.write_text("hello world", encoding="utf-8")
+        catalog.write_marker(self.video_dir, "abcdefghijk")
+
+    def rows(self):
+        conn = catalog.open_catalog(self.base)
+        video = dict(catalog.get_video(conn, "abcdefghijk"))
+        artifact = dict(catalog.get_artifact(conn, "abcdefghijk", "clean_text"))
+        conn.close()
+        return video, artifact
+
+    def test_keeps_created_at_backend_and_model(self):
+        with mock.patch.object(catalog, "_now", return_value="2026-01-01T00:00:00+00:00"):
+            conn = catalog.open_catalog(self.base)
+            with conn:
+                catalog.record_video(conn, "abcdefghijk", "Some_Title", self.video_dir)
+                catalog.record_artifact(conn, "abcdefghijk", "clean_text", self.clean, backend="api")
+            conn.close()
+
+        with mock.patch.object(catalog, "_now", return_value="2026-06-01T00:00:00+00:00"):
+            self.assertEqual(catalog.rebuild(self.base), 1)
+        video, artifact = self.rows()
+        self.assertEqual(video["created_at"], "2026-01-01T00:00:00+00:00")
+        self.assertEqual(video["updated_at"], "2026-06-01T00:00:00+00:00")
+        self.assertEqual(artifact["created_at"], "2026-01-01T00:00:00+00:00")
+        self.assertEqual(artifact["backend"], "api")
+
+        # A changed file drops the stale backend but keeps when it was first seen
+        self.clean.write_text("hello again", encoding="utf-8")
+        with mock.patch.object(catalog, "_now", return_value="2026-07-01T00:00:00+00:00"):
+            catalog.rebuild(self.base)
+        video, artifact = self.rows()
+        self.assertEqual(artifact["created_at"], "2026-01-01T00:00:00+00:00")
+        self.assertEqual(artifact["updated_at"], "2026-07-01T00:00:00+00:00")
+        self.assertIsNone(artifact["backend"])
+
+    def test_map_backfills_marker(self):
+        (self.video_dir / catalog.VIDEO_ID_FILENAME).unlink()
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(catalog.rebuild(self.base), 0)
+        self.assertIn("--map 'Some_Title=<video_id>'", out.getvalue())
+        self.assertEqual(catalog.rebuild(self.base, {"Some_Title": "abcdefghijk"}), 1)
+        self.assertEqual(
+            (self.video_dir / catalog.VIDEO_ID_FILENAME).read_text(encoding="utf-8").strip(),
+            "abcdefghijk",
+        )
+
+    def test_recognises_recreated_directory_of_packed_video(self):
+        conn = catalog.open_catalog(self.base)
+        with conn:
+            catalog.record_video(conn, "abcdefghijk", "Some_Title", self.video_dir)
+            catalog.record_artifact(conn, "abcdefghijk", "clean_text", self.clean)
+        archive.pack_video(conn, "abcdefghijk", None)
+        conn.close()
+        self.assertFalse(self.video_dir.exists())
+
+        # A later transform writes a new output into a fresh directory
+        self.video_dir.mkdir()
+        (self.video_dir / "Some_Title_coding.md").write_text("# Output", encoding="utf-8")
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(catalog.rebuild(self.base), 1)
+        self.assertNotIn("Skipping", out.getvalue())
+        self.assertTrue((self.video_dir / catalog.VIDEO_ID_FILENAME).is_file())
+        conn = catalog.open_catalog(self.base)
+        self.assertIsNotNone(catalog.get_artifact(conn, "abcdefghijk", "style:coding"))
+        conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+"""Tests for fetch_session.py: rate limiting, 429 back-off and proxy rotation.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import socket
+import time
+import unittest
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import requests
+
+try:
+    import pytube
+    import pytube.request
+except ImportError:
+    pytube = None
+
+import fetch_session
+from fetch_session import MIN_RATE, ProxyPool, ThrottledSession, TokenBucket
+from stub_youtube import RateLimitedServer
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_clamps_config(self):
+        bucket = TokenBucket(0, 0.5)
+        self.assertEqual(bucket.rate, MIN_RATE)
+        self.assertEqual(bucket.capacity, 1)
+        bucket.acquire()  # would loop forever with capacity < 1
+
+    def test_penalize_and_reward(self):
+        bucket = TokenBucket(4, 4)
+        bucket.penalize(0)
+        self.assertEqual(bucket.rate, 2)
+        bucket.reward()
+        self.assertAlmostEqual(bucket.rate, 2.2)
+
+
+class ThrottledSessionTest(unittest.TestCase):
+    """Drive a session 4x faster than the server allows, through a dead and a live proxy."""
+
+    ALLOW = 10
+    REQUESTS = 30
+
+    def test_absorbs_429s_and_benches_dead_proxy(self):
+        dead_proxy = f"http://127.0.0.1:{unused_port()}"
+        with RateLimitedServer(self.ALLOW, retry_after=0.2) as server:
+            pool = ProxyPool([dead_proxy, server.url])
+            limiter = TokenBucket(self.ALLOW * 4, self.ALLOW * 4)
+            session = ThrottledSession(limiter, pool)
+            self.addCleanup(session.close)
+
+            def fetch(i):
+                try:
+                    return session.get(f"{server.url}/video/{i}", timeout=5).status_code
+                except requests.RequestException as e:
+                    return type(e).__name__
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                codes = Counter(executor.map(fetch, range(self.REQUESTS)))
+
+        self.assertEqual(codes, Counter({200: self.REQUESTS}))
+        self.assertGreater(server.served[429], 0)
+        self.assertLess(limiter.rate, limiter.max_rate)
+        dead, live = pool.health[dead_proxy], pool.health[server.url]
+        self.assertGreater(dead["failures"], 0)
+        self.assertGreater(dead["cooldown_until"], time.monotonic())
+        self.assertEqual(live["successes"], self.REQUESTS)
+        self.assertEqual(live["failures"], 0)
+
+
+@unittest.skipIf(pytube is None, "pytube not installed")
+class PytubeTest(unittest.TestCase):
+    def setUp(self):
+        # Undo the wrapper and any proxy opener pytube installs
+        patcher = mock.patch.object(pytube.request, "_execute_request", pytube.request._execute_request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(urllib.request.install_opener, None)
+
+    def test_takes_a_token_per_request(self):
+        limiter = TokenBucket(20, 1)
+        with RateLimitedServer(100) as server, \
+                mock.patch.object(fetch_session, "_session", ThrottledSession(limiter)):
+            fetch_session.throttle_pytube()
+            fetch_session.throttle_pytube()  # idempotent: still one token per request
+            start = time.monotonic()
+            for i in range(6):
+                pytube.request.get(f"{server.url}/video/{i}")
+            elapsed = time.monotonic() - start
+        self.assertEqual(server.served[200], 6)
+        # One token in the bucket, then five more at 20/s
+        self.assertGreaterEqual(elapsed, 0.2)
+        self.assertLess(elapsed, 1.0)
+
+    def test_proxies_route_requests(self):
+        with RateLimitedServer(100) as server, RateLimitedServer(100) as proxy:
+            pytube.YouTube("https://www.youtube.com/watch?v=abcdefghijk", proxies={"http": proxy.url})
+            pytube.request.get(f"{server.url}/video/0")
+        self.assertEqual(proxy.served[200], 1)
+        self.assertEqual(server.served[200], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for prompts.py: transcript compression and fitting to a token budget.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import random
+import unittest
+
+from prompts import compress_transcript, count_tokens, fit_transcript
+
+
+def words(prefix: str, n: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(n))
+
+
+class CompressTranscriptTest(unittest.TestCase):
+    def test_drops_fillers(self):
+        self.assertEqual(compress_transcript("um so the thing, uh, works"), "so the thing, works")
+
+    def test_uh_huh_is_removed_whole(self):
+        self.assertEqual(compress_transcript("uh-huh yes"), "yes")
+
+    def test_keeps_repeated_words(self):
+        self.assertEqual(compress_transcript("I had had enough"), "I had had enough")
+        self.assertEqual(compress_transcript("That that is is that"), "That that is is that")
+
+    def test_keeps_paragraphs(self):
+        self.assertEqual(compress_transcript("one  two\n\n\n\nthree"), "one two\n\nthree")
+
+
+class FitTranscriptTest(unittest.TestCase):
+    def assertWithin(self, text: str, max_tokens: int):
+        self.assertLessEqual(count_tokens(text), max_tokens)
+
+    def test_unchanged_when_it_fits(self):
+        text = "A short transcript.\n\nTwo paragraphs."
+        self.assertEqual(fit_transcript(text, 1000), (text, False))
+
+    def test_no_paragraph_breaks(self):
+        text = words("w", 2000)
+        out, trimmed = fit_transcript(text, 500)
+        self.assertTrue(trimmed)
+        self.assertWithin(out, 500)
+        head, marker, tail = out.split("\n\n")
+        self.assertTrue(head.startswith("w0 w1 "))
+        self.assertTrue(tail.endswith(" w1999"))
+        self.assertIn("words omitted", marker)
+        # Most of the budget goes to transcript words, not just the marker
+        self.assertGreater(count_tokens(head + tail), 500 * 0.8)
+
+    def test_oversized_first_paragraph(self):
+        text = words("head", 3000) + "\n\n" + "\n\n".join(f"Paragraph {i} ends here." for i in range(5))
+        out, trimmed = fit_transcript(text, 500)
+        self.assertTrue(trimmed)
+        self.assertWithin(out, 500)
+        self.assertTrue(out.startswith("head0 head1 "))
+        self.assertTrue(out.endswith("Paragraph 4 ends here."))
+
+    def test_stays_within_max_tokens(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            paragraphs = [
+                " ".join(rng.choice(["alpha", "beta.", "gamma", "delta!", "epsilon?"])
+                         for _ in range(rng.choice([3, 40, 400, 2000])))
+                for _ in range(rng.randint(1, 20))
+            ]
+            max_tokens = rng.choice([5, 21, 50, 200, 1000, 5000])
+            out, _ = fit_transcript("\n\n".join(paragraphs), max_tokens)
+            self.assertWithin(out, max_tokens)
+
+    def test_zero_budget(self):
+        out, trimmed = fit_transcript(words("w", 100), 0)
+        self.assertEqual(out, "")
+        self.assertTrue(trimmed)
+
+    def test_budget_of_one(self):
+        out, trimmed = fit_transcript(words("w", 100), 1)
+        self.assertWithin(out, 1)
+        self.assertTrue(trimmed)
+
+
+if __name__ == "__main__":
+    unittest.main()
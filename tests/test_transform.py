@@ -0,0 +1,142 @@
+"""Tests for transform_transcript.py: multi-style fan-out, near-duplicate reuse
+and diff updates.
+
+Run from the project root: python -m unittest discover -s tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import catalog
+import near_duplicates
+import transform_transcript
+from stub_openrouter import DEFAULT_CONTENT, StubOpenRouter
+
+
+STYLE = "# Test Style\n\n### 1. Overview\nOne paragraph.\n\n### 2. Steps\nNumbered steps.\n"
+
+
+def sentences(n: int, start: int = 0) -> str:
+    return " ".join(f"Sentence number {i} says something new." for i in range(start, start + n))
+
+
+class DuplicateTest(unittest.TestCase):
+    """Video "orig" has a coding output; "copy" is a near-duplicate of it."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.base = Path(tmp.name)
+        self.conn = catalog.open_catalog(self.base)
+        self.addCleanup(self.conn.close)
+        self.original = sentences(400)
+        # Two sentences changed: still well above the similarity threshold
+        self.copy = self.original.replace("Sentence number 7 ", "Sentence number 7b ").replace(
+            "number 300 ", "number 300b "
+        )
+        for video_id, text in (("orig", self.original), ("copy", self.copy)):
+            video_dir = self.base / video_id
+            video_dir.mkdir()
+            clean = video_dir / f"{video_id}_clean_text.txt"
+            clean.write_text(text, encoding="utf-8")
+            with self.conn:
+                catalog.record_video(self.conn, video_id, video_id, video_dir)
+                catalog.record_artifact(self.conn, video_id, "clean_text", clean)
+                near_duplicates.index_text(self.conn, video_id, text)
+        output = self.base / "orig" / "orig_coding.md"
+        output.write_text("---\nmodel: m\n---\n\n" + DEFAULT_CONTENT, encoding="utf-8")
+        with self.conn:
+            catalog.record_artifact(self.conn, "orig", "style:coding", output, model="m")
+
+    def plan(self, diff_transform: bool):
+        video = catalog.get_video(self.conn, "copy")
+        sig = near_duplicates.signature(self.copy)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return transform_transcript._plan_duplicate(
+                self.conn, video, "coding", STYLE, sig, self.copy, diff_transform
+            )
+
+    def test_reuses_output(self):
+        plan = self.plan(diff_transform=False)
+        self.assertEqual(plan["video_id"], "orig")
+        self.assertEqual(plan["diff"], "")
+        self.assertEqual(plan["body"], DEFAULT_CONTENT)
+
+    def test_diff_plan(self):
+        plan = self.plan(diff_transform=True)
+        self.assertIn("+Sentence number 7b says something new.", plan["diff"])
+
+    def test_diff_over_budget_falls_back_to_full_transform(self):
+        with mock.patch.dict(os.environ, {"TRANSCRIPT_TOKEN_BUDGET": "100"}):
+            self.assertIsNone(self.plan(diff_transform=True))
+
+    def test_diff_update_uses_cascade(self):
+        plan = self.plan(diff_transform=True)
+        script = {"cheap/model": "No headings here."}
+        with StubOpenRouter(script) as stub, \
+                mock.patch.object(transform_transcript, "OPENROUTER_BASE", stub.base_url), \
+                mock.patch.dict(os.environ, {"MODEL_CASCADE": "cheap/model,strong/model"}), \
+                contextlib.redirect_stdout(io.StringIO()):
+            body, usage, _ = transform_transcript._run_style(
+                "coding", STYLE, self.copy, "key", plan, True, "style",
+                self.base / "usage_log.jsonl", "copy",
+            )
+        self.assertEqual(stub.models_called(), ["cheap/model", "strong/model"])
+        self.assertIn("# Transcript Diff", stub.requests[0]["messages"][1]["content"])
+        self.assertEqual(usage["model"], "strong/model")
+        self.assertEqual(usage["duplicate_of"], "orig")
+        self.assertEqual(body, DEFAULT_CONTENT.strip())
+
+
+class FanOutTest(unittest.TestCase):
+    """main() with several styles against the stub server."""
+
+    STYLES = ["alpha", "beta", "gamma"]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        (root / "styles").mkdir()
+        for name in self.STYLES:
+            (root / "styles" / f"{name}.md").write_text(f"# {name}\n\n{STYLE}", encoding="utf-8")
+        self.video_dir = root / "Generated_Data" / "Vid"
+        self.video_dir.mkdir(parents=True)
+        (self.video_dir / "Vid_clean_text.txt").write_text(sentences(50), encoding="utf-8")
+        # main() resolves styles/ and Generated_Data/ next to the script
+        patcher = mock.patch.object(transform_transcript, "__file__", str(root / "transform_transcript.py"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_first_style_warms_cache_before_fan_out(self):
+        argv = ["transform_transcript.py", str(self.video_dir), ",".join(self.STYLES), "--no-dedup"]
+        with StubOpenRouter(delay=0.2) as stub, \
+                mock.patch.object(transform_transcript, "OPENROUTER_BASE", stub.base_url), \
+                mock.patch.dict(os.environ, {"OPENROUTER_API_KEY": "key", "TRANSFORM_CONCURRENCY": "3"}), \
+                mock.patch("sys.argv", argv), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(transform_transcript.main(), 0)
+
+        spans = sorted(stub.spans, key=lambda span: span[1])
+        self.assertEqual(len(spans), 3)
+        first, start, end = spans[0]
+        self.assertTrue(first["messages"][1]["content"].startswith("# alpha"))
+        # The rest only start once the first response is back...
+        self.assertTrue(all(other_start >= end for _, other_start, _ in spans[1:]))
+        # ...and then run concurrently
+        self.assertLess(spans[2][1], spans[1][2])
+        # Every request shares the same cacheable transcript prefix
+        prefixes = {json.dumps(body["messages"][0]) for body, _, _ in spans}
+        self.assertEqual(len(prefixes), 1)
+        for name in self.STYLES:
+            self.assertTrue((self.video_dir / f"Vid_{name}.md").is_file())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,12 +2,31 @@
 """Transform a transcript using a style guide via OpenRouter (openrouter/free).
 
 API key: OPENROUTER_API_KEY from environment, or from .env in project root.
-Usage: python transform_transcript.py <video_dir> <style_name>
+Usage: python transform_transcript.py <video_dir> <style_name|all> [style_name ...]
+           [--cascade] [--diff-transform] [--no-dedup]
+
+Several styles (space- or comma-separated, or "all" for every styles/*.md)
+share one read of the transcript and are transformed concurrently, at most
+TRANSFORM_CONCURRENCY (default 3) at a time, after the first style has run
+alone to write the shared transcript prefix to the provider's cache. Each
+output is written as soon as its style finishes.
+
+--cascade routes through MODEL_CASCADE (cheapest model first), escalating to
+a stronger model only when the output fails local validity checks.
+
+Before any LLM call the transcript is checked against the near-duplicate
+index; if a near-identical transcript already has an output for this style,
+that output is reused. --diff-transform instead sends the existing output
+plus a transcript diff to the model for a cheap update. --no-dedup skips the
+check.
 """
 
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from datetime import date
+from functools import partial
 from pathlib import Path
 
 # Load .env before reading env vars (project root = parent of this script's dir)
@@ -20,9 +39,25 @@ except ImportError:
 
 from openai import APIError, OpenAI
 
+import archive
+import catalog
+import near_duplicates
+from cascade import get_cascade, transform_with_cascade
+from prompts import (
+    build_diff_messages,
+    build_messages,
+    count_tokens,
+    extract_usage,
+    fit_transcript,
+    get_token_budget,
+    record_usage,
+)
+from style_guides import missing_styles, print_available_styles, resolve_styles
+
 
 OPENROUTER_BASE = "https://openrouter.ai/api/v1"
 MODEL = "google/gemini-3-flash-preview"
+DEFAULT_CONCURRENCY = 3
 
 
 def get_api_key():
@@ -32,24 +67,73 @@ def get_api_key():
     return key.strip()
 
 
-def find_clean_text(video_dir: Path) -> Path | None:
+def find_clean_text(video_dir: Path, catalog_conn=None) -> Path | None:
+    if catalog_conn is not None:
+        path = catalog.find_artifact_path(catalog_conn, video_dir, "clean_text")
+        if path is not None and archive.exists(catalog_conn, path):
+            return path
+    if not video_dir.is_dir():
+        return None
+    # Not cataloged (e.g. a directory outside Generated_Data): scan it
     for f in video_dir.iterdir():
         if f.is_file() and f.name.endswith("_clean_text.txt"):
             return f
     return None
 
 
-def transform_with_openrouter(style_content: str, transcript_content: str, api_key: str) -> str:
-    user_content = (
-        f"{style_content}\n\n---\n\n# Transcript to Transform\n\n{transcript_content}\n\n"
-        "Transform the above transcript according to the style guide. "
-        "Output ONLY the transformed document, no commentary or meta-discussion."
+def get_concurrency() -> int:
+    value = os.environ.get("TRANSFORM_CONCURRENCY", "").strip()
+    try:
+        return max(1, int(value)) if value else DEFAULT_CONCURRENCY
+    except ValueError:
+        return DEFAULT_CONCURRENCY
+
+
+def transform_with_openrouter(
+    style_content: str,
+    transcript_content: str,
+    api_key: str,
+    model: str = MODEL,
+    shared_prefix: str = "style",
+) -> tuple[str, dict]:
+    """Transform a transcript with a single model (MODEL by default).
+
+    shared_prefix selects the cacheable prompt layout (see prompts.build_messages).
+
+    Returns: (content, usage_info) where usage_info includes cached-token counts
+    and whether the transcript had to be trimmed to the token budget.
+    """
+    messages, prompt_info = build_messages(
+        style_content, transcript_content, model, shared_prefix=shared_prefix
     )
+    if prompt_info["trimmed"]:
+        print(
+            f"  Transcript trimmed to fit token budget "
+            f"(~{prompt_info['prompt_tokens_estimate']} prompt tokens)"
+        )
+    content, usage = _complete(messages, api_key, model)
+    usage["trimmed"] = prompt_info["trimmed"]
+    return content, usage
+
+
+def transform_diff_with_openrouter(
+    style_content: str, previous_output: str, transcript_diff: str, api_key: str, model: str = MODEL
+) -> tuple[str, dict]:
+    """Update an existing output from a transcript diff instead of a full transform."""
+    messages, prompt_info = build_diff_messages(style_content, previous_output, transcript_diff, model)
+    if not prompt_info["fits"]:
+        raise ValueError(
+            f"Diff prompt (~{prompt_info['prompt_tokens_estimate']} tokens) exceeds the token budget."
+        )
+    return _complete(messages, api_key, model)
+
+
+def _complete(messages: list[dict], api_key: str, model: str) -> tuple[str, dict]:
     client = OpenAI(base_url=OPENROUTER_BASE, api_key=api_key)
     response = client.chat.completions.create(
-        model=MODEL,
-        messages=[{"role": "user", "content": user_content}],
-        extra_body={"reasoning": {"enabled": True}},
+        model=model,
+        messages=messages,
+        extra_body={"reasoning": {"enabled": True}, "usage": {"include": True}},
     )
     message = response.choices[0].message
     content = (message.content or "").strip()
@@ -57,38 +141,191 @@ def transform_with_openrouter(style_content: str, transcript_content: str, api_k
         raise ValueError(
             "OpenRouter returned empty content. Check model availability and response."
         )
-    return content
+    return content, extract_usage(response)
+
+
+def strip_front_matter(text: str) -> str:
+    if text.startswith("---\n"):
+        end = text.find("\n---\n", 4)
+        if end != -1:
+            return text[end + 5:].lstrip("\n")
+    return text
+
+
+def _plan_duplicate(conn, video, style_name, style_content, sig, transcript_content, diff_transform):
+    """Near-duplicate reuse plan for one style, or None to run a full transform.
+
+    sig and transcript_content are for the full, untrimmed clean text. A diff
+    update whose prompt would exceed the token budget falls back to a full
+    transform. Runs on the main thread (it reads the catalog); the returned
+    dict carries everything the worker needs.
+    """
+    duplicate = near_duplicates.find_transformed_duplicate(
+        conn,
+        sig,
+        style_name,
+        near_duplicates.get_threshold(),
+        exclude=video["video_id"] if video else None,
+    )
+    if duplicate is None:
+        return None
+    dup_id, similarity, dup_output, dup_clean = duplicate
+    try:
+        body = strip_front_matter(archive.read_text(conn, dup_output))
+        diff = ""
+        if diff_transform and dup_clean and archive.exists(conn, dup_clean):
+            diff = near_duplicates.transcript_diff(archive.read_text(conn, dup_clean), transcript_content)
+    except RuntimeError as e:
+        print(f"  [{style_name}] Near-duplicate of {dup_id} is unreadable ({e}); running a full transform")
+        return None
+    if diff:
+        _, prompt_info = build_diff_messages(style_content, body, diff, MODEL)
+        if not prompt_info["fits"]:
+            print(
+                f"  [{style_name}] Near-duplicate of {dup_id}, but the diff prompt "
+                f"(~{prompt_info['prompt_tokens_estimate']} tokens) exceeds the token budget; "
+                "running a full transform"
+            )
+            return None
+    dup_artifact = catalog.get_artifact(conn, dup_id, f"style:{style_name}")
+    return {
+        "video_id": dup_id,
+        "similarity": similarity,
+        "body": body,
+        "diff": diff,
+        "model": dup_artifact["model"] or "unknown",
+    }
+
+
+def _run_style(
+    style_name: str,
+    style_content: str,
+    transcript_content: str,
+    api_key: str,
+    duplicate: dict | None,
+    use_cascade: bool,
+    shared_prefix: str,
+    usage_log: Path,
+    title: str,
+) -> tuple[str, dict, float]:
+    """Produce the body for one style. Returns: (body, usage, elapsed_seconds)."""
+    start = time.time()
+    label = f"  [{style_name}]"
+    if duplicate:
+        dup_id, similarity = duplicate["video_id"], duplicate["similarity"]
+        if duplicate["diff"]:
+            print(f"{label} Near-duplicate of {dup_id} (Jaccard ~{similarity:.2f}); updating from diff")
+            update = partial(
+                _transform_diff, previous_output=duplicate["body"], transcript_diff=duplicate["diff"]
+            )
+            if use_cascade:
+                # Same escalation and validation as a full cascade transform
+                body, usage = transform_with_cascade(
+                    style_content,
+                    transcript_content,
+                    api_key,
+                    update,
+                    models=get_cascade(),
+                    log_file=usage_log,
+                    log_context={"title": title, "style": style_name, "duplicate_of": dup_id},
+                )
+            else:
+                body, usage = update(style_content, transcript_content, api_key)
+                usage["model"] = MODEL
+        else:
+            print(f"{label} Near-duplicate of {dup_id} (Jaccard ~{similarity:.2f}); reusing its output")
+            body, usage = duplicate["body"], {"model": duplicate["model"]}
+        usage["duplicate_of"] = dup_id
+        usage["similarity"] = similarity
+    elif use_cascade:
+        models = get_cascade()
+        print(f"{label} Cascade: {' -> '.join(models)}")
+        body, usage = transform_with_cascade(
+            style_content,
+            transcript_content,
+            api_key,
+            partial(transform_with_openrouter, shared_prefix=shared_prefix),
+            models=models,
+            log_file=usage_log,
+            log_context={"title": title, "style": style_name},
+        )
+    else:
+        body, usage = transform_with_openrouter(
+            style_content, transcript_content, api_key, shared_prefix=shared_prefix
+        )
+        usage["model"] = MODEL
+    return body, usage, time.time() - start
+
+
+def _transform_diff(
+    style_content, transcript_content, api_key, model=MODEL, *, previous_output, transcript_diff
+):
+    """transform_diff_with_openrouter with the call signature transform_with_cascade expects."""
+    return transform_diff_with_openrouter(
+        style_content, previous_output, transcript_diff, api_key, model=model
+    )
+
+
+def _front_matter(style_name: str, usage: dict, today: str) -> str:
+    duplicate_line = f"duplicate_of: {usage['duplicate_of']}\n" if "duplicate_of" in usage else ""
+    return f"""---
+type: tutorial
+category: development
+domain:
+  - youtube-transcript
+  - {style_name}
+source: youtube-transcript-transform
+model: {usage["model"]}
+{duplicate_line}created: {today}
+status: inbox-triage
+tags:
+  - tutorial
+  - {style_name}
+  - transformed-transcript
+summary: Transformed YouTube transcript using {style_name} style guide.
+enriched_at: ""
+---
+
+"""
 
 
 def main() -> int:
-    if len(sys.argv) < 3:
-        script_dir = Path(__file__).resolve().parent
-        styles_dir = script_dir / "styles"
-        print("Usage: python transform_transcript.py <video_dir> <style_name>", file=sys.stderr)
-        if styles_dir.is_dir():
-            print("\nAvailable styles:", file=sys.stderr)
-            for f in sorted(styles_dir.glob("*.md")):
-                print(f"  {f.stem}", file=sys.stderr)
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    use_cascade = "--cascade" in sys.argv[1:]
+    diff_transform = "--diff-transform" in sys.argv[1:]
+    dedup = "--no-dedup" not in sys.argv[1:]
+    script_dir = Path(__file__).resolve().parent
+    styles_dir = script_dir / "styles"
+    if len(args) < 2:
+        print(
+            "Usage: python transform_transcript.py <video_dir> <style_name|all> [style_name ...] "
+            "[--cascade] [--diff-transform] [--no-dedup]",
+            file=sys.stderr,
+        )
+        print(file=sys.stderr)
+        print_available_styles(styles_dir)
         return 1
 
-    video_dir = Path(sys.argv[1]).resolve()
-    style_name = sys.argv[2]
-    script_dir = Path(__file__).resolve().parent
-    style_file = script_dir / "styles" / f"{style_name}.md"
+    video_dir = Path(args[0]).resolve()
+    style_names = resolve_styles(args[1:], styles_dir)
     output_base = script_dir / "Generated_Data"
 
-    if not video_dir.is_dir():
+    conn = catalog.open_catalog(output_base)
+    if not video_dir.is_dir() and not archive.is_archived(conn, video_dir):
         print(f"Error: Directory not found: {video_dir}", file=sys.stderr)
         return 1
-    if not style_file.is_file():
-        print(f"Error: Style guide not found: {style_file}", file=sys.stderr)
-        if (script_dir / "styles").is_dir():
-            print("Available styles:", file=sys.stderr)
-            for f in sorted((script_dir / "styles").glob("*.md")):
-                print(f"  {f.stem}", file=sys.stderr)
+    if not style_names:
+        print("Error: No styles given.", file=sys.stderr)
+        print_available_styles(styles_dir)
+        return 1
+    missing = missing_styles(style_names, styles_dir)
+    if missing:
+        for style_file in missing:
+            print(f"Error: Style guide not found: {style_file}", file=sys.stderr)
+        print_available_styles(styles_dir)
         return 1
 
-    clean_text_path = find_clean_text(video_dir)
+    clean_text_path = find_clean_text(video_dir, conn)
     if not clean_text_path:
         print(f"Error: No *_clean_text.txt found in {video_dir}", file=sys.stderr)
         return 1
@@ -106,49 +343,126 @@ def main() -> int:
         print("  OPENROUTER_API_KEY=your_key_here", file=sys.stderr)
         return 1
 
+    try:
+        clean_text = archive.read_text(conn, clean_text_path)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    transcript_content = clean_text
+
     title = clean_text_path.stem.replace("_clean_text", "")
     video_dir_name = video_dir.name
     output_dir = output_base / video_dir_name
     output_dir.mkdir(parents=True, exist_ok=True)
-    output_file = output_dir / f"{title}_{style_name}.md"
     today = date.today().isoformat()
 
-    style_content = style_file.read_text(encoding="utf-8")
-    transcript_content = clean_text_path.read_text(encoding="utf-8")
+    style_contents = {
+        name: (styles_dir / f"{name}.md").read_text(encoding="utf-8") for name in style_names
+    }
+
+    # One style: style guide is the cached prefix (shared across videos).
+    # Several styles: the transcript is the cached prefix (shared across styles),
+    # trimmed once against the longest style guide so every request sees the
+    # exact same prefix.
+    shared_prefix = "style"
+    if len(style_names) > 1:
+        shared_prefix = "transcript"
+        longest_style = max(count_tokens(c) for c in style_contents.values())
+        transcript_content, trimmed = fit_transcript(
+            transcript_content, max(get_token_budget() - longest_style - 200, 0)
+        )
+        if trimmed:
+            print("  Transcript trimmed to fit token budget")
 
     print("Transforming transcript...")
     print(f"  Input: {clean_text_path}")
-    print(f"  Style: {style_name}")
-    print(f"  Output: {output_file}")
+    print(f"  Styles: {', '.join(style_names)}")
+    print(f"  Output dir: {output_dir}")
 
-    try:
-        body = transform_with_openrouter(style_content, transcript_content, api_key)
-    except (ValueError, APIError) as e:
-        print(f"Error: OpenRouter request failed: {e}", file=sys.stderr)
-        return 1
+    usage_log = output_base / "usage_log.jsonl"
+    video = catalog.get_video_by_directory(conn, output_dir)
+    if video is not None and not (output_dir / catalog.VIDEO_ID_FILENAME).is_file():
+        # The directory was re-created for a packed video; keep it rebuildable
+        catalog.write_marker(output_dir, video["video_id"])
+    # Duplicate lookup uses the full clean text, signed once; trimming is only for the prompt
+    sig = near_duplicates.signature(clean_text) if dedup else None
+    duplicates = {
+        name: _plan_duplicate(
+            conn, video, name, style_contents[name], sig, clean_text, diff_transform
+        ) if dedup else None
+        for name in style_names
+    }
 
-    front_matter = f"""---
-type: tutorial
-category: development
-domain:
-  - youtube-transcript
-  - {style_name}
-source: youtube-transcript-transform
-created: {today}
-status: inbox-triage
-tags:
-  - tutorial
-  - {style_name}
-  - transformed-transcript
-summary: Transformed YouTube transcript using {style_name} style guide.
-enriched_at: ""
----
+    # Providers only serve a cached prefix once the request that writes it has
+    # been answered, so with a shared transcript prefix the first full
+    # transform runs alone and the rest fan out after it
+    warm_up = None
+    if shared_prefix == "transcript":
+        pending = [name for name in style_names if duplicates[name] is None]
+        if len(pending) > 1:
+            warm_up = pending[0]
 
-"""
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(get_concurrency(), len(style_names))) as pool:
+        def submit(name):
+            return pool.submit(
+                _run_style,
+                name,
+                style_contents[name],
+                transcript_content,
+                api_key,
+                duplicates[name],
+                use_cascade,
+                shared_prefix,
+                usage_log,
+                title,
+            )
+
+        futures = {}
+        if warm_up is not None:
+            print(f"  [{warm_up}] Warming the shared transcript prefix before fanning out")
+            futures[submit(warm_up)] = warm_up
+            wait(futures)
+        futures.update({submit(name): name for name in style_names if name != warm_up})
+        # Outputs are written (and cataloged) on this thread as each style finishes
+        for future in as_completed(futures):
+            style_name = futures[future]
+            label = f"  [{style_name}]"
+            try:
+                body, usage, elapsed = future.result()
+            except (ValueError, APIError) as e:
+                print(f"Error: OpenRouter request failed for {style_name}: {e}", file=sys.stderr)
+                results[style_name] = {"status": "error"}
+                continue
+
+            if usage.get("prompt_tokens") is not None:
+                print(
+                    f"{label} Tokens: {usage['prompt_tokens']} in "
+                    f"({usage.get('cached_tokens', 0)} cached), {usage['completion_tokens']} out"
+                )
+            if "attempts" not in usage:
+                # The cascade logs every attempt itself
+                record_usage(usage_log, {"title": title, "style": style_name, **usage})
+
+            output_file = output_dir / f"{title}_{style_name}.md"
+            output_file.write_text(_front_matter(style_name, usage, today) + body, encoding="utf-8")
+            if video is not None:
+                with conn:
+                    catalog.record_artifact(
+                        conn, video["video_id"], f"style:{style_name}", output_file,
+                        model=usage["model"],
+                    )
+            print(f"{label} Created: {output_file} ({elapsed:.1f}s)")
+            results[style_name] = {"status": "ok", "elapsed": elapsed, "model": usage["model"]}
+    conn.close()
 
-    output_file.write_text(front_matter + body, encoding="utf-8")
-    print(f"\nCreated: {output_file}")
-    return 0
+    if len(style_names) > 1:
+        print(f"\n{'Style':<24} {'Status':<8} {'Time':>8}  Model")
+        for style_name in style_names:
+            r = results[style_name]
+            elapsed = f"{r['elapsed']:.1f}s" if "elapsed" in r else "-"
+            print(f"{style_name:<24} {r['status']:<8} {elapsed:>8}  {r.get('model', '-')}")
+    return 0 if all(r["status"] == "ok" for r in results.values()) else 1
 
 
 if __name__ == "__main__":
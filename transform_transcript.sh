@@ -1,6 +1,7 @@
 #!/bin/bash
-# Transform a transcript using a style guide via OpenRouter (openrouter/free)
-# Usage: ./transform_transcript.sh <video_dir> <style_name>
+# Transform a transcript using one or more style guides via OpenRouter (openrouter/free)
+# Usage: ./transform_transcript.sh <video_dir> <style_name|all> [style_name ...] [--flags]
+# Styles may also be comma-separated; several styles are transformed concurrently.
 # Requires OPENROUTER_API_KEY in environment or .env
 
 set -e
@@ -11,34 +12,16 @@ SCRIPT_DIR="$(dirname "$0")"
 
 # Validate arguments
 if [[ -z "$VIDEO_DIR" || -z "$STYLE" ]]; then
-    echo "Usage: ./transform_transcript.sh <video_dir> <style_name>"
+    echo "Usage: ./transform_transcript.sh <video_dir> <style_name|all> [style_name ...]"
     echo ""
     echo "Available styles:"
     ls -1 "${SCRIPT_DIR}/styles/" 2>/dev/null | sed 's/\.md$//' | sed 's/^/  /'
     exit 1
 fi
 
-# Validate video directory exists
-if [[ ! -d "$VIDEO_DIR" ]]; then
-    echo "Error: Directory not found: $VIDEO_DIR"
-    exit 1
-fi
-
-# Validate style guide exists
-STYLE_FILE="${SCRIPT_DIR}/styles/${STYLE}.md"
-if [[ ! -f "$STYLE_FILE" ]]; then
-    echo "Error: Style guide not found: $STYLE_FILE"
-    echo ""
-    echo "Available styles:"
-    ls -1 "${SCRIPT_DIR}/styles/" 2>/dev/null | sed 's/\.md$//' | sed 's/^/  /'
-    exit 1
-fi
-
-# Validate clean text file exists
-if [[ -z "$(find "$VIDEO_DIR" -name "*_clean_text.txt" | head -1)" ]]; then
-    echo "Error: No *_clean_text.txt file found in $VIDEO_DIR"
-    exit 1
-fi
+# Style names (including comma lists and "all"), the video directory and its
+# clean text are validated by transform_transcript.py, which also finds them
+# when the video has been packed by archive.py
 
 # Run Python transform (OpenRouter)
 TRANSFORM_SCRIPT="${SCRIPT_DIR}/transform_transcript.py"
@@ -46,5 +29,5 @@ if [[ ! -f "$TRANSFORM_SCRIPT" ]]; then
     echo "Error: transform_transcript.py not found at $TRANSFORM_SCRIPT"
     exit 1
 fi
-uv run python "$TRANSFORM_SCRIPT" "$VIDEO_DIR" "$STYLE"
+uv run python "$TRANSFORM_SCRIPT" "$VIDEO_DIR" "${@:2}"
 exit $?